@@ -2,46 +2,275 @@ import time
 import threading
 import random
 import logging
+import heapq
+import itertools
+import queue
+import struct
+import numpy as np
+from enum import IntEnum
 from paxos_main.essential import Proposer, Acceptor, Learner, ProposalID
+from paxos_core import NO_PROPOSAL, prepare_update, accept_update
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Message class
+# Message type tags; the int values double as the wire codes
+class MsgType(IntEnum):
+    PREPARE = 0
+    PROMISE = 1
+    ACCEPT = 2
+    ACCEPTED = 3
+
+# Wire format: fixed-size header that precedes the value bytes
+# type, sender, receiver, proposal round/uid, prev round/uid, value length
+WIRE_HEADER = struct.Struct('<BHHIHIHH')
+NO_ROUND = 0xFFFFFFFF
+NO_VALUE = 0xFFFF
+
+# Proposal ids are packed ints, (round << 16) | proposer index, so acceptor and
+# learner ordering checks are plain int compares instead of tuple compares
+def make_proposal_id(round_, uid_index):
+    return (round_ << 16) | uid_index
+
+def split_proposal_id(proposal_id):
+    return proposal_id >> 16, proposal_id & 0xFFFF
+
+# Message class. The receiver is not part of the message: the network carries it
+# alongside, so one Message can be shared by every receiver of a broadcast.
 class Message:
-    def __init__(self, msg_type, sender, receiver, proposal_id, prev_id=None, value=None):
+    __slots__ = ('msg_type', 'sender', 'proposal_id', 'prev_id', 'value', 'refs')
+
+    def __init__(self, msg_type, sender, proposal_id, prev_id=None, value=None):
         self.msg_type = msg_type
         self.sender = sender
-        self.receiver = receiver
         self.proposal_id = proposal_id
         self.prev_id = prev_id
         self.value = value
+        self.refs = 0  # pending deliveries, tracked by the network for pooling
+
+    def pack(self, receiver, node_index) -> bytes:
+        """Encode into the fixed wire layout; node ids are mapped to u16 via node_index"""
+        prev_round, prev_uid = (NO_ROUND, 0) if self.prev_id is None else split_proposal_id(self.prev_id)
+        if self.value is None:
+            value = b''
+        elif not isinstance(self.value, str):
+            raise ValueError(f"only str values can be packed, got {type(self.value).__name__}")
+        else:
+            value = self.value.encode()
+            # NO_VALUE is the "no value" marker, so the longest value must stay below it
+            if len(value) >= NO_VALUE:
+                raise ValueError(f"value too long to pack: {len(value)} bytes (max {NO_VALUE - 1})")
+        header = WIRE_HEADER.pack(self.msg_type,
+                                  node_index[self.sender], node_index[receiver],
+                                  *split_proposal_id(self.proposal_id),
+                                  prev_round, prev_uid,
+                                  NO_VALUE if self.value is None else len(value))
+        return header + value
+
+    @classmethod
+    def unpack(cls, buf, node_ids):
+        """Decode a buffer produced by pack() into (receiver, message); node_ids maps u16 indexes back to ids"""
+        (code, sender, receiver, round_, uid,
+         prev_round, prev_uid, value_len) = WIRE_HEADER.unpack_from(buf)
+        prev_id = None if prev_round == NO_ROUND else make_proposal_id(prev_round, prev_uid)
+        value = None
+        if value_len != NO_VALUE:
+            start = WIRE_HEADER.size
+            value = bytes(buf[start:start + value_len]).decode()
+        return node_ids[receiver], cls(MsgType(code), node_ids[sender],
+                                       make_proposal_id(round_, uid), prev_id, value)
+
+# Free list of Message objects, reused once every receiver has handled them
+class MessagePool:
+    def __init__(self):
+        self._free = []
+
+    def get(self, *args, **kwargs) -> Message:
+        try:
+            msg = self._free.pop()
+        except IndexError:
+            msg = Message.__new__(Message)
+        msg.__init__(*args, **kwargs)
+        return msg
+
+    def put(self, msg: Message):
+        msg.value = None
+        self._free.append(msg)
 
 # Network simulator
 class Network:
-    def __init__(self, delay_range=(0.0, 0.2), drop_rate=0.0):
+    def __init__(self, delay_range=(0.0, 0.2), drop_rate=0.0, virtual_clock=False,
+                 batch_interval=0.01, max_batch=128):
         self.nodes = {}
+        # Dense u16 index per node id, used by the message wire format
+        self.node_ids = []
+        self.node_index = {}
+        # Node ids indexed by role at registration time
+        self.proposer_ids = []
+        self.acceptor_ids = []
+        self.learner_ids = []
         self.delay_range = delay_range
         self.drop_rate = drop_rate
+        # Deliveries to a receiver are coalesced until max_batch messages are
+        # pending or batch_interval has passed; batch_interval=0 disables it
+        self.batch_interval = batch_interval
+        self.max_batch = max_batch
+        self._batches = {}
+        self.pool = MessagePool()
+        # Senders push (deadline, seq, callback, args) onto a lock-free inbox;
+        # the single scheduler thread owns the deadline heap and dispatches.
+        self._inbox = queue.SimpleQueue()
+        self._pq = []
+        self._seq = itertools.count()
+        # With a virtual clock, deliveries only happen in advance_until_idle()
+        self.virtual_clock = virtual_clock
+        self.virtual_now = 0.0
+        if not virtual_clock:
+            threading.Thread(target=self._run_scheduler, daemon=True).start()
 
     def register(self, node):
         self.nodes[node.node_id] = node
+        self.node_index[node.node_id] = len(self.node_ids)
+        self.node_ids.append(node.node_id)
+        if isinstance(node, PaxosProposer):
+            self.proposer_ids.append(node.node_id)
+        elif isinstance(node, PaxosAcceptor):
+            self.acceptor_ids.append(node.node_id)
+        elif isinstance(node, PaxosLearner):
+            self.learner_ids.append(node.node_id)
 
-    def send(self, msg: Message):
+    def send(self, msg: Message, receiver):
         if random.random() < self.drop_rate:
-            logger.warning(f"[DROP] {msg.msg_type} from {msg.sender} to {msg.receiver}")
+            if logger.isEnabledFor(logging.WARNING):
+                logger.warning("[DROP] %s from %s to %s", msg.msg_type.name, msg.sender, receiver)
+            self.pool.put(msg)
             return
 
+        msg.refs = 1
         delay = random.uniform(*self.delay_range)
-        threading.Timer(delay, self._deliver, args=[msg]).start()
+        self._schedule(delay, self._deliver, msg, receiver)
+
+    def send_broadcast(self, msg: Message, receivers):
+        # One vectorized Bernoulli draw for the whole fan-out
+        drops = np.random.random(len(receivers)) < self.drop_rate
+        delivered = []
+        keep = delivered.append
+        log_drops = logger.isEnabledFor(logging.WARNING)
+        for receiver, dropped in zip(receivers, drops):
+            if dropped:
+                if log_drops:
+                    logger.warning("[DROP] %s from %s to %s", msg.msg_type.name, msg.sender, receiver)
+            else:
+                keep(receiver)
+        if not delivered:
+            self.pool.put(msg)
+            return
+
+        msg.refs = len(delivered)
+        delay = random.uniform(*self.delay_range)
+        self._schedule(delay, self._deliver_broadcast, msg, delivered)
+
+    def stop(self):
+        self._inbox.put(None)
+
+    def _schedule(self, delay, callback, *args):
+        if self.virtual_clock:
+            heapq.heappush(self._pq, (self.virtual_now + delay, next(self._seq), callback, args))
+        else:
+            self._inbox.put((time.monotonic() + delay, next(self._seq), callback, args))
+
+    def advance_until_idle(self, horizon=float('inf')):
+        """Deliver queued messages in deadline order, moving the virtual clock forward"""
+        pq = self._pq
+        while pq and pq[0][0] <= horizon:
+            self.virtual_now, _, callback, args = heapq.heappop(pq)
+            callback(*args)
+
+    def _run_scheduler(self):
+        pq = self._pq
+        inbox = self._inbox
+        while True:
+            # Deliver everything that is due; receivers may send replies
+            now = time.monotonic()
+            while pq and pq[0][0] <= now:
+                _, _, callback, args = heapq.heappop(pq)
+                try:
+                    callback(*args)
+                except Exception:
+                    # Lose only this delivery; the scheduler thread must keep running
+                    logger.exception("Error in scheduled callback")
+                now = time.monotonic()
+
+            timeout = pq[0][0] - now if pq else None
+            try:
+                item = inbox.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            if item is None:
+                return
+            heapq.heappush(pq, item)
 
-    def _deliver(self, msg: Message):
-        if msg.receiver in self.nodes:
-            self.nodes[msg.receiver].receive(msg)
+    def _deliver(self, msg: Message, receiver):
+        self._enqueue(receiver, msg)
+
+    def _deliver_broadcast(self, msg: Message, receivers):
+        # Every receiver handles the same (read-only) message object
+        enqueue = self._enqueue
+        for receiver in receivers:
+            enqueue(receiver, msg)
+
+    # Batches are only touched from the delivering thread, so they need no lock
+    def _enqueue(self, receiver, msg: Message):
+        if not self.batch_interval:
+            node = self.nodes.get(receiver)
+            if node is not None:
+                node.receive(msg)
+            self._release(msg)
+            return
+
+        batch = self._batches.get(receiver)
+        if batch is None:
+            batch = self._batches[receiver] = []
+            self._schedule(self.batch_interval, self._flush_batch, receiver, batch)
+        batch.append(msg)
+        if len(batch) >= self.max_batch:
+            self._flush_batch(receiver, batch)
+
+    def _flush_batch(self, receiver, batch):
+        # Flushed once: either when full or when its interval expires
+        if self._batches.get(receiver) is not batch:
+            return
+        del self._batches[receiver]
+        node = self.nodes.get(receiver)
+        if node is not None:
+            node.receive_batch(batch)
+        for msg in batch:
+            self._release(msg)
+
+    def _release(self, msg: Message):
+        # Handlers only read fields synchronously, so the message can be
+        # recycled as soon as its last receiver is done with it
+        msg.refs -= 1
+        if not msg.refs:
+            self.pool.put(msg)
 
 # Paxos nodes
-class PaxosProposer(Proposer):
+class NetworkNode:
+    # Subclasses fill self._dispatch with {MsgType: handler(msg)}
+    def receive(self, msg: Message):
+        handler = self._dispatch.get(msg.msg_type)
+        if handler is not None:
+            handler(msg)
+
+    def receive_batch(self, msgs):
+        dispatch = self._dispatch.get
+        for msg in msgs:
+            handler = dispatch(msg.msg_type)
+            if handler is not None:
+                handler(msg)
+
+class PaxosProposer(NetworkNode, Proposer):
     def __init__(self, node_id, network, quorum):
         super().__init__()
         self.node_id = node_id
@@ -49,68 +278,82 @@ class PaxosProposer(Proposer):
         self.quorum_size = quorum
         self.proposer_uid = node_id
         self.messenger = self
+        self._dispatch = {
+            MsgType.PROMISE: lambda msg: self.recv_promise(msg.sender, msg.proposal_id, msg.prev_id, msg.value),
+        }
         network.register(self)
 
+    def prepare(self):
+        # Same as Proposer.prepare, but with a packed int proposal id
+        self.promises_rcvd = set()
+        self.proposal_id = make_proposal_id(self.next_proposal_number, self.network.node_index[self.node_id])
+        self.next_proposal_number += 1
+        self.messenger.send_prepare(self.proposal_id)
+
     def send_prepare(self, proposal_id):
-        for node in self.network.nodes.values():
-            if isinstance(node, PaxosAcceptor):
-                msg = Message('prepare', self.node_id, node.node_id, proposal_id)
-                self.network.send(msg)
+        msg = self.network.pool.get(MsgType.PREPARE, self.node_id, proposal_id)
+        self.network.send_broadcast(msg, self.network.acceptor_ids)
 
     def send_accept(self, proposal_id, proposal_value):
-        for node in self.network.nodes.values():
-            if isinstance(node, PaxosAcceptor):
-                msg = Message('accept', self.node_id, node.node_id, proposal_id, value=proposal_value)
-                self.network.send(msg)
-
-    def receive(self, msg: Message):
-        if msg.msg_type == 'promise':
-            self.recv_promise(msg.sender, msg.proposal_id, msg.prev_id, msg.value)
+        msg = self.network.pool.get(MsgType.ACCEPT, self.node_id, proposal_id, value=proposal_value)
+        self.network.send_broadcast(msg, self.network.acceptor_ids)
 
-class PaxosAcceptor(Acceptor):
+class PaxosAcceptor(NetworkNode, Acceptor):
     def __init__(self, node_id, network):
         super().__init__()
         self.node_id = node_id
         self.network = network
         self.messenger = self
+        self._dispatch = {
+            MsgType.PREPARE: lambda msg: self.recv_prepare(msg.sender, msg.proposal_id),
+            MsgType.ACCEPT: lambda msg: self.recv_accept_request(msg.sender, msg.proposal_id, msg.value),
+        }
+        self.promised_id = NO_PROPOSAL
         network.register(self)
 
+    # Same rules as essential.Acceptor, with the id comparisons in paxos_core
+    def recv_prepare(self, from_uid, proposal_id):
+        self.promised_id, promise = prepare_update(self.promised_id, proposal_id)
+        if promise:
+            self.send_promise(from_uid, proposal_id, self.accepted_id, self.accepted_value)
+
+    def recv_accept_request(self, from_uid, proposal_id, value):
+        self.promised_id, accepted = accept_update(self.promised_id, proposal_id)
+        if accepted:
+            self.accepted_id = proposal_id
+            self.accepted_value = value
+            self.send_accepted(proposal_id, value)
+
     def send_promise(self, to_uid, proposal_id, prev_id, value):
-        msg = Message('promise', self.node_id, to_uid, proposal_id, prev_id, value)
-        self.network.send(msg)
+        msg = self.network.pool.get(MsgType.PROMISE, self.node_id, proposal_id, prev_id, value)
+        self.network.send(msg, to_uid)
 
     def send_accepted(self, proposal_id, accepted_value):
-        for node in self.network.nodes.values():
-            if isinstance(node, PaxosLearner):
-                msg = Message('accepted', self.node_id, node.node_id, proposal_id, value=accepted_value)
-                self.network.send(msg)
+        msg = self.network.pool.get(MsgType.ACCEPTED, self.node_id, proposal_id, value=accepted_value)
+        self.network.send_broadcast(msg, self.network.learner_ids)
 
-    def receive(self, msg: Message):
-        if msg.msg_type == 'prepare':
-            self.recv_prepare(msg.sender, msg.proposal_id)
-        elif msg.msg_type == 'accept':
-            self.recv_accept_request(msg.sender, msg.proposal_id, msg.value)
-
-class PaxosLearner(Learner):
+class PaxosLearner(NetworkNode, Learner):
     def __init__(self, node_id, network, quorum):
         super().__init__()
         self.node_id = node_id
         self.network = network
         self.quorum_size = quorum
         self.messenger = self
+        self._dispatch = {
+            MsgType.ACCEPTED: lambda msg: self.recv_accepted(msg.sender, msg.proposal_id, msg.value),
+        }
         network.register(self)
 
     def on_resolution(self, proposal_id, value):
-        logger.info(f"[CONSENSUS] Learner {self.node_id} learned value: {value} (proposal {proposal_id})")
-
-    def receive(self, msg: Message):
-        if msg.msg_type == 'accepted':
-            self.recv_accepted(msg.sender, msg.proposal_id, msg.value)
+        logger.info("[CONSENSUS] Learner %s learned value: %s (proposal %s)", self.node_id, value, proposal_id)
 
 # Simulation
 
-def simulate():
-    net = Network(delay_range=(0.1, 0.3), drop_rate=0.1)
+def simulate(benchmark=False):
+    if benchmark:
+        # Skip per-message log formatting when timing runs
+        logger.setLevel(logging.WARNING)
+    net = Network(delay_range=(0.1, 0.3), drop_rate=0.1, virtual_clock=True)
 
     proposer = PaxosProposer('P1', net, quorum=2)
     acceptors = [PaxosAcceptor(f'A{i}', net) for i in range(3)]
@@ -119,7 +362,8 @@ def simulate():
     proposer.set_proposal("value42")
     proposer.prepare()
 
-    time.sleep(5)
+    net.advance_until_idle(horizon=5.0)
+    net.stop()
 
 if __name__ == "__main__":
     simulate()
@@ -1,32 +1,26 @@
 from paxos_main.essential import Proposer, Acceptor, Learner, ProposalID
-import threading
+import collections
 import time
 
 class SimpleMessenger:
     def __init__(self):
-        self.messages = []
-        self.lock = threading.Lock()
+        self.messages = collections.deque()  # append is thread-safe, no lock needed
     
     def send_prepare(self, proposal_id):
-        with self.lock:
-            self.messages.append(('prepare', proposal_id))
+        self.messages.append(('prepare', proposal_id))
     
     def send_promise(self, to_uid, proposal_id, previous_id, accepted_value):
-        with self.lock:
-            self.messages.append(('promise', to_uid, proposal_id, previous_id, accepted_value))
+        self.messages.append(('promise', to_uid, proposal_id, previous_id, accepted_value))
     
     def send_accept(self, proposal_id, proposal_value):
-        with self.lock:
-            self.messages.append(('accept', proposal_id, proposal_value))
+        self.messages.append(('accept', proposal_id, proposal_value))
     
     def send_accepted(self, proposal_id, accepted_value):
-        with self.lock:
-            self.messages.append(('accepted', proposal_id, accepted_value))
+        self.messages.append(('accepted', proposal_id, accepted_value))
     
     def on_resolution(self, proposal_id, value):
-        with self.lock:
-            self.messages.append(('resolution', proposal_id, value))
-            print(f"Consensus reached! Value: {value}")
+        self.messages.append(('resolution', proposal_id, value))
+        print(f"Consensus reached! Value: {value}")
 
 def main():
     # Create messengers for each node
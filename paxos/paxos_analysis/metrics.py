@@ -1,12 +1,94 @@
-import time
+from time import perf_counter
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
-import matplotlib.pyplot as plt
-from paxos_simulation import simulate_paxos, NetworkSimulator, PaxosProposer, PaxosAcceptor, PaxosLearner, ProposalID
+from paxos_simulation import simulate_paxos, EventClock, NetworkSimulator, PaxosProposer, PaxosAcceptor, PaxosLearner, ProposalID
 import logging
 
 logging.basicConfig(level=logging.CRITICAL)  # suppress verbose logs
 
-def headless_run(drop_rate, num_crashes=0, num_proposers=2, num_acceptors=3, num_learners=2):
+PHASE_TIMEOUT = 0.5    # worst-case wait for one protocol phase
+DECIDE_TIMEOUT = 1.0   # worst-case wait for the learners
+VIRTUAL_TIME = True    # drive headless runs from an EventClock instead of real threads
+MIN_RUNS = 3           # runs per point before the stopping rule is checked
+SEM_SUCCESS = 0.02     # stop once the success-rate standard error drops below this
+SEM_LATENCY = 0.05     # ... and the latency standard error (seconds) below this
+
+def wait_phase(nodes, timeout=PHASE_TIMEOUT):
+    """Wait until every running node has signalled phase_done (or the timeout runs out), then reset the events"""
+    clock = nodes[0].network.clock if nodes else None
+    if clock is not None:
+        clock.run_until_idle(timeout)
+    else:
+        deadline = perf_counter() + timeout
+        for n in nodes:
+            if n.running:
+                n.phase_done.wait(max(0.0, deadline - perf_counter()))
+    for n in nodes:
+        n.phase_done.clear()
+
+def wait_decided(network, learners_done, timeout=DECIDE_TIMEOUT):
+    """Wait for any learner to decide, advancing virtual time if the network has a clock"""
+    if network.clock is not None:
+        network.clock.run_until_idle(timeout)
+        return learners_done.is_set()
+    return learners_done.wait(timeout)
+
+def run_proposer(proposer, acceptors, value, piggyback=True):
+    """Drive one proposer through the protocol phases; with piggyback the accept rides along with phase 1b"""
+    # Phase 1a
+    proposer.set_proposal(value)
+    proposer.prepare()
+    wait_phase(acceptors)
+    
+    uid, pid = proposer.node_id, proposer.proposal_id
+    running_acceptors = [a for a in acceptors if a.running]  # Only send to running acceptors
+    
+    if piggyback:
+        # Phase 1b + 2b in a single pass over the acceptors
+        for a in running_acceptors:
+            a.recv_prepare_and_accept(uid, pid, value)
+        wait_phase(acceptors)
+        return
+    
+    # Phase 1b responses
+    for a in running_acceptors:
+        a.recv_prepare(uid, pid)
+    wait_phase(acceptors)
+    
+    # Phase 2a accept
+    proposer.send_accept(pid, value)
+    wait_phase(acceptors)
+    
+    # Phase 2b accept responses
+    for a in running_acceptors:
+        a.recv_accept_request(uid, pid, value)
+
+_topologies = {}  # per-process network + nodes, keyed on (proposers, acceptors, learners)
+
+def build_topology(network, num_proposers, num_acceptors, num_learners):
+    quorum = num_acceptors // 2 + 1
+    proposers = [PaxosProposer(f'P{i}', network, quorum) for i in range(num_proposers)]
+    acceptors = [PaxosAcceptor(f'A{i}', network) for i in range(num_acceptors)]
+    learners  = [PaxosLearner(f'L{i}', network, quorum) for i in range(num_learners)]
+    return proposers, acceptors, learners
+
+def pooled_topology(drop_rate, num_proposers, num_acceptors, num_learners, rng=None):
+    """Reuse this process's virtual-time network and nodes for the given shape, reset for a fresh run"""
+    key = (num_proposers, num_acceptors, num_learners)
+    if key not in _topologies:
+        network = NetworkSimulator((0.0, 0.0), drop_rate, clock=EventClock(), rng=rng)
+        _topologies[key] = (network,) + build_topology(network, *key)
+        return _topologies[key]
+    network, proposers, acceptors, learners = _topologies[key]
+    network.reset(rng)
+    network.failure_rate = drop_rate
+    for node in proposers+acceptors+learners:
+        node.reset()
+    return network, proposers, acceptors, learners
+
+def headless_run(drop_rate, num_crashes=0, num_proposers=2, num_acceptors=3, num_learners=2, piggyback=True,
+                 virtual_time=VIRTUAL_TIME, seed=None):
     """
     Run one simulation headlessly, returns:
       latency   : time to reach consensus (sec or None if failed)
@@ -15,38 +97,28 @@ def headless_run(drop_rate, num_crashes=0, num_proposers=2, num_acceptors=3, num
       success   : bool
     """
     try:
-        # Initialize network
-        network = NetworkSimulator((0.0, 0.0), drop_rate)
-        # Create nodes
-        proposers = [PaxosProposer(f'P{i}', network, num_acceptors//2+1) for i in range(num_proposers)]
-        acceptors = [PaxosAcceptor(f'A{i}', network) for i in range(num_acceptors)]
-        learners  = [PaxosLearner(f'L{i}', network, num_acceptors//2+1) for i in range(num_learners)]
+        # A seed makes the drop pattern reproducible
+        rng = np.random.default_rng(seed) if seed is not None else None
+        if virtual_time:
+            network, proposers, acceptors, learners = pooled_topology(drop_rate, num_proposers, num_acceptors,
+                                                                      num_learners, rng)
+        else:
+            # Real-time runs leave timer threads behind, so they always get fresh objects
+            network = NetworkSimulator((0.0, 0.0), drop_rate, rng=rng)
+            proposers, acceptors, learners = build_topology(network, num_proposers, num_acceptors, num_learners)
+        # Share one event so the first learner with a final_value wakes us up
+        learners_done = threading.Event()
+        for l in learners:
+            l.phase_done = learners_done
         # Register nodes
         for node in proposers+acceptors+learners:
             node.start()
         
         # Run the Paxos phases
-        t0 = time.time()
-        
-        # Phase 1a
-        proposers[0].set_proposal("Value")
-        proposers[0].prepare()
-        time.sleep(0.5)  # Increased wait time
-        
-        # Phase 1b responses
-        for a in acceptors:
-            if a.running:  # Only send to running acceptors
-                a.recv_prepare("P0", proposers[0].proposal_id)
-        time.sleep(0.5)  # Increased wait time
-        
-        # Phase 2a accept
-        proposers[0].send_accept(proposers[0].proposal_id, "Value")
-        time.sleep(0.5)  # Increased wait time
+        t0 = network.now()
         
-        # Phase 2b accept responses
-        for a in acceptors:
-            if a.running:  # Only send to running acceptors
-                a.recv_accept_request("P0", proposers[0].proposal_id, "Value")
+        # Phases 1a-2b for the first proposer
+        run_proposer(proposers[0], acceptors, "Value", piggyback)
         
         # Crash leaders if requested
         proposers[0].running = False
@@ -56,37 +128,23 @@ def headless_run(drop_rate, num_crashes=0, num_proposers=2, num_acceptors=3, num
             if i < len(acceptors):
                 acceptors[i].running = False
         
-        time.sleep(1.0)  # Increased wait time
+        decided = wait_decided(network, learners_done)
         
-        # New proposer takes over
-        if num_proposers>1:
-            proposers[1].set_proposal("Value2")
-            proposers[1].prepare()
-            time.sleep(0.5)  # Increased wait time
+        # New proposer takes over, unless a value is already chosen or too few acceptors are left for a quorum
+        alive = len(network.running_acceptors)
+        if num_proposers>1 and not decided and alive >= proposers[0].quorum_size:
+            run_proposer(proposers[1], acceptors, "Value2", piggyback)
             
-            for a in acceptors:
-                if a.running:
-                    a.recv_prepare("P1", proposers[1].proposal_id)
-            time.sleep(0.5)  # Increased wait time
-            
-            proposers[1].send_accept(proposers[1].proposal_id, "Value2")
-            time.sleep(0.5)  # Increased wait time
-            
-            for a in acceptors:
-                if a.running:
-                    a.recv_accept_request("P1", proposers[1].proposal_id, "Value2")
+            # Wait for any learner to decide
+            wait_decided(network, learners_done)
         
-        # Wait longer for learners
-        time.sleep(1.0)
+        # Check learner for consensus
+        success = any(l.final_value is not None for l in learners if l.running)
+        latency = network.now() - t0 if success else None
         
-        # Stop network
+        # Stop network (and with it every node)
         network.stop()
         
-        # Check learner for consensus
-        final_vals = [l.final_value for l in learners if l.running]
-        success = any(v is not None for v in final_vals)
-        latency = time.time() - t0 if success else None
-        
         return latency, network.message_count, network.dropped_messages, success
     
     except Exception as e:
@@ -94,84 +152,154 @@ def headless_run(drop_rate, num_crashes=0, num_proposers=2, num_acceptors=3, num
         return None, 0, 0, False
 
 
-def batch_drop_rate(drop_rates, runs=10):
-    latencies = []
-    totals    = []
-    drops     = []
-    successes = []
-    for dr in drop_rates:
-        run_lat = []
-        run_tot = []
-        run_drop= []
-        run_suc = []
-        for _ in range(runs):
-            lat, tot, drp, suc = headless_run(dr)
-            run_lat.append(lat if lat is not None else np.nan)
-            run_tot.append(tot)
-            run_drop.append(drp)
-            run_suc.append(1 if suc else 0)
-        latencies.append(np.nanmean(run_lat))
-        totals.append(np.mean(run_tot))
-        drops.append(np.mean(run_drop))
-        successes.append(np.mean(run_suc))
-    return np.array(latencies), np.array(totals), np.array(drops), np.array(successes)
-
-
-def batch_crash_counts(crash_counts, drop_rate=0.1, runs=10):
-    latencies = []
-    successes = []
-    for nc in crash_counts:
-        run_lat = []
-        run_suc = []
-        for _ in range(runs):
-            lat, _, _, suc = headless_run(drop_rate, num_crashes=nc)
-            run_lat.append(lat if lat is not None else np.nan)
-            run_suc.append(1 if suc else 0)
-        latencies.append(np.nanmean(run_lat))
-        successes.append(np.mean(run_suc))
-    return np.array(latencies), np.array(successes)
+def seeded_run(params):
+    """headless_run over a (drop_rate, num_crashes, seed, piggyback) tuple, for executor.map"""
+    drop_rate, num_crashes, seed, piggyback = params
+    return headless_run(drop_rate, num_crashes=num_crashes, piggyback=piggyback, seed=seed)
+
+
+def converged(samples):
+    """True once the standard error of success (and of latency over successful runs) is small enough"""
+    n = len(samples)
+    sem_suc = np.nanstd(samples[:, 3]) / np.sqrt(n)
+    lat = samples[:, 0][~np.isnan(samples[:, 0])]
+    sem_lat = np.std(lat) / np.sqrt(len(lat)) if len(lat) else 0.0
+    return sem_suc < SEM_SUCCESS and sem_lat < SEM_LATENCY
+
+
+def adaptive_batch(points, runs, min_runs=MIN_RUNS, max_workers=None, piggyback=True):
+    """
+    Run every (drop_rate, num_crashes) point at least min_runs and at most runs times,
+    stopping early once its estimates have converged. Returns a (points, runs, 4) array
+    of (latency, total, dropped, success) with NaN for runs that were skipped.
+    piggyback picks the fused Multi-Paxos path (True) or the separate phase 1b/2a/2b path.
+    """
+    results = np.full((len(points), runs, 4), np.nan)
+    done = [0] * len(points)
+    active = list(range(len(points)))
+    batch = min(min_runs, runs)
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        while active:
+            # Run j of a point always uses seed j
+            jobs = [(i, j) for i in active for j in range(done[i], min(done[i] + batch, runs))]
+            out = executor.map(seeded_run, [points[i] + (j, piggyback) for i, j in jobs], chunksize=4)
+            for (i, j), (lat, tot, drp, suc) in zip(jobs, out):
+                results[i, j] = (lat if lat is not None else np.nan, tot, drp, float(suc))
+            for i in active:
+                done[i] = min(done[i] + batch, runs)
+            active = [i for i in active if done[i] < runs and not converged(results[i, :done[i]])]
+            batch = 1
+    return results
+
+
+def batch_drop_rate(drop_rates, runs=10, max_workers=None, min_runs=MIN_RUNS, piggyback=True):
+    # Every run is independent, so spread them over worker processes
+    results = adaptive_batch([(dr, 0) for dr in drop_rates], runs, min_runs, max_workers, piggyback)
+    return (np.nanmean(results[..., 0], axis=1), np.nanmean(results[..., 1], axis=1),
+            np.nanmean(results[..., 2], axis=1), np.nanmean(results[..., 3], axis=1))
+
+
+def batch_crash_counts(crash_counts, drop_rate=0.1, runs=10, max_workers=None, min_runs=MIN_RUNS, piggyback=True):
+    results = adaptive_batch([(drop_rate, nc) for nc in crash_counts], runs, min_runs, max_workers, piggyback)
+    return np.nanmean(results[..., 0], axis=1), np.nanmean(results[..., 3], axis=1)
+
+
+def batch_grid(drop_rates, crash_counts, runs=10, crash_drop_rate=None, max_workers=None, min_runs=MIN_RUNS,
+               piggyback=True):
+    """
+    Sample (drop_rate, num_crashes) cells, returns a (len(drop_rates), len(crash_counts), runs, 4) array.
+    With crash_drop_rate set only the no-crash column and that drop rate's row are run; other cells stay NaN.
+    """
+    crash_counts = list(crash_counts)
+    if crash_drop_rate is None:
+        cells = [(i, k) for i in range(len(drop_rates)) for k in range(len(crash_counts))]
+    else:
+        rows = np.flatnonzero(np.isclose(drop_rates, crash_drop_rate))
+        if not len(rows):
+            raise ValueError(f"crash_drop_rate {crash_drop_rate} is not one of the drop rates")
+        col = crash_counts.index(0)
+        cells = [(i, col) for i in range(len(drop_rates))]
+        cells += [(rows[0], k) for k in range(len(crash_counts)) if k != col]
+    samples = adaptive_batch([(drop_rates[i], crash_counts[k]) for i, k in cells], runs, min_runs, max_workers,
+                             piggyback)
+    grid = np.full((len(drop_rates), len(crash_counts), runs, 4), np.nan)
+    for (i, k), cell in zip(cells, samples):
+        grid[i, k] = cell
+    return grid
+
+
+_fig = None  # reused across plot_all calls
+
+def _metrics_figure():
+    """Return the shared 2x2 metrics figure with fresh axes"""
+    global _fig
+    if _fig is None:
+        # Imported here so batch runs and pool workers never pay for matplotlib
+        import matplotlib
+        matplotlib.use('Agg')  # render straight to file, no GUI event loop
+        import matplotlib.pyplot as plt
+        _fig = plt.figure(figsize=(12, 10), dpi=100)
+    else:
+        _fig.clf()
+    return _fig, _fig.subplots(2, 2)
 
 
 def plot_all():
-    drop_rates = np.linspace(0, 0.9, 10)
+    drop_rates = np.round(np.linspace(0, 0.9, 10), 2)
     crash_counts = list(range(4))  # 0..3
     runs = 20
 
-    lat, tot, drp, suc = batch_drop_rate(drop_rates, runs)
-    lat_c, suc_c = batch_crash_counts(crash_counts, drop_rate=0.3, runs=runs)
+    # One pass covers both sweeps; the (0.3, 0 crashes) cell is shared
+    grid = batch_grid(drop_rates, crash_counts, runs, crash_drop_rate=0.3)
+    sweep = grid[:, crash_counts.index(0)]
+    lat, tot, drp, suc = (np.nanmean(sweep[..., c], axis=1) for c in range(4))
+    crashes = grid[int(np.flatnonzero(np.isclose(drop_rates, 0.3))[0])]
+    lat_c, suc_c = np.nanmean(crashes[..., 0], axis=1), np.nanmean(crashes[..., 3], axis=1)
+    # Same drop-rate sweep over the unfused path (separate phase 1b, 2a and 2b messages)
+    lat_u, tot_u, drp_u, suc_u = batch_drop_rate(drop_rates, runs, piggyback=False)
 
-    fig, axs = plt.subplots(2, 2, figsize=(12, 10))
+    fig, axs = _metrics_figure()
+    x = drop_rates * 100  # shared x axis for the drop-rate plots
 
     ax = axs[0,0]
-    ax.plot(drop_rates*100, lat, marker='o')
+    ax.plot(x, lat, marker='o', label='Fused (Multi-Paxos)', rasterized=True)
+    ax.plot(x, lat_u, marker='s', label='Unfused', rasterized=True)
+    ax.legend()
+    ax.set_xticks(x)
     ax.set_title('Consensus Latency vs. Drop Rate')
     ax.set_xlabel('Message Drop Rate (%)')
     ax.set_ylabel('Latency (s)')
 
     ax = axs[0,1]
-    ax.plot(drop_rates*100, tot, marker='o')
+    ax.plot(x, tot, marker='o', label='Fused (Multi-Paxos)', rasterized=True)
+    ax.plot(x, tot_u, marker='s', label='Unfused', rasterized=True)
+    ax.legend()
+    ax.set_xticks(x)
     ax.set_title('Total Messages vs. Drop Rate')
     ax.set_xlabel('Message Drop Rate (%)')
     ax.set_ylabel('Total Messages Sent')
 
     ax = axs[1,0]
-    ax.plot(drop_rates*100, suc, marker='o')
+    ax.plot(x, suc, marker='o', label='Fused (Multi-Paxos)', rasterized=True)
+    ax.plot(x, suc_u, marker='s', label='Unfused', rasterized=True)
+    ax.legend()
+    ax.set_xticks(x)
     ax.set_title('Success Rate vs. Drop Rate')
     ax.set_xlabel('Message Drop Rate (%)')
     ax.set_ylabel('Success Fraction')
 
     ax = axs[1,1]
     ax2 = ax.twinx()
-    ax.plot(crash_counts, suc_c, 'r-o', label='Success Rate')
-    ax2.plot(crash_counts, lat_c, 'b-s', label='Latency')
-    ax.set_title('Impact of Crashes (Drop Rate 30%)')
+    ax.plot(crash_counts, suc_c, 'r-o', label='Success Rate', rasterized=True)
+    ax2.plot(crash_counts, lat_c, 'b-s', label='Latency', rasterized=True)
+    ax.set_xticks(crash_counts)
+    ax.set_title('Impact of Crashes (Drop Rate 30%, fused path)')
     ax.set_xlabel('Number of Additional Acceptor Crashes')
     ax.set_ylabel('Success Fraction', color='r')
     ax2.set_ylabel('Latency (s)', color='b')
 
     fig.tight_layout()
-    plt.savefig('paxos_metrics.png')
-    plt.show()
+    fig.savefig('paxos_metrics.png', dpi=100, bbox_inches='tight')
 
 
 if __name__ == '__main__':
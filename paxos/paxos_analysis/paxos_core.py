@@ -0,0 +1,30 @@
+# Pure acceptor state transitions on packed int proposal ids.
+# Kept free of Python objects so the functions can be JIT compiled by numba
+# when it is installed, and stay cheap under PyPy when it is not.
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda fn: fn
+
+# Sentinel for "nothing promised yet"; packed proposal ids are never negative
+NO_PROPOSAL = -1
+
+
+@njit(cache=True)
+def prepare_update(promised_id, proposal_id):
+    '''Returns (promised_id, send_promise) after a Prepare for proposal_id'''
+    if proposal_id > promised_id:
+        return proposal_id, True
+    # A duplicate prepare is answered again
+    return promised_id, proposal_id == promised_id
+
+
+@njit(cache=True)
+def accept_update(promised_id, proposal_id):
+    '''Returns (promised_id, accepted) after an Accept! for proposal_id'''
+    if proposal_id >= promised_id:
+        return proposal_id, True
+    return promised_id, False
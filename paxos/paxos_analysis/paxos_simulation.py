@@ -2,7 +2,9 @@ from paxos_main.essential import Proposer, Acceptor, Learner, ProposalID
 import threading
 import time
 import random
-import queue
+import heapq
+import itertools
+from collections import deque
 from typing import Dict, List, Tuple, Optional, TYPE_CHECKING
 import logging
 
@@ -10,7 +12,14 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+DROP_BUFFER = 4096  # drop decisions drawn per refill when a numpy rng is supplied
+DELAY_BUFFER = 4096  # unit delays drawn per refill when a numpy rng is supplied
+MESSAGE_POOL_CAP = 1024  # most released messages kept for reuse
+
 class NetworkMessage:
+    __slots__ = ('msg_type', 'sender', 'receiver', 'proposal_id', 'previous_id', 'accepted_value',
+                 'dropped', 'id', 'retries')
+    
     def __init__(self, msg_type: str, sender: str, receiver: str,
                  proposal_id: ProposalID, previous_id: Optional[ProposalID] = None,
                  accepted_value: Optional[str] = None, dropped=False):
@@ -21,11 +30,82 @@ class NetworkMessage:
         self.previous_id = previous_id
         self.accepted_value = accepted_value
         self.dropped = dropped
+        self.id = next(NetworkMessage._ids)
+        self.retries = 0  # Times the network has resent this message after a drop
+        
+    # Recycled instances; deque append/pop are atomic, so no lock is needed
+    _pool = deque()
+    _ids = itertools.count(1)  # Message ids; next() on a count is atomic, so no lock is needed
+    
+    @classmethod
+    def acquire(cls, msg_type: str, sender: str, receiver: str,
+                proposal_id: ProposalID, previous_id: Optional[ProposalID] = None,
+                accepted_value: Optional[str] = None):
+        """Take a message from the pool, or build one if it is empty"""
+        try:
+            msg = cls._pool.pop()
+        except IndexError:
+            return cls(msg_type, sender, receiver, proposal_id, previous_id, accepted_value)
+        msg.msg_type = msg_type
+        msg.sender = sender
+        msg.receiver = receiver
+        msg.proposal_id = proposal_id
+        msg.previous_id = previous_id
+        msg.accepted_value = accepted_value
+        msg.dropped = False
+        msg.id = next(cls._ids)
+        msg.retries = 0
+        return msg
+        
+    @classmethod
+    def release(cls, msg: 'NetworkMessage'):
+        """Hand a message back once nothing reads it any more"""
+        msg.proposal_id = msg.previous_id = msg.accepted_value = None
+        if len(cls._pool) < MESSAGE_POOL_CAP:
+            cls._pool.append(msg)
+
+class EventClock:
+    """Virtual-time event loop for headless runs; callbacks run in time order on the caller's thread"""
+    def __init__(self):
+        self._now = 0.0
+        self._events = []  # heap of (time, seq, fn, args)
+        self._seq = 0
+        
+    def now(self):
+        return self._now
+        
+    def reset(self):
+        """Drop all pending events and rewind to time zero"""
+        self._now = 0.0
+        self._events.clear()
+        self._seq = 0
+        
+    def schedule(self, delay, fn, *args):
+        """Run fn(*args) once the virtual clock has advanced by delay"""
+        self._seq += 1
+        heapq.heappush(self._events, (self._now + delay, self._seq, fn, args))
+        
+    def run_until_idle(self, timeout=None):
+        """Run events until none are left, or none are due within timeout from now"""
+        horizon = None if timeout is None else self._now + timeout
+        events = self._events
+        while events and (horizon is None or events[0][0] <= horizon):
+            when, _, fn, args = heapq.heappop(events)
+            self._now = when
+            fn(*args)
+        return not events
 
 class NetworkSimulator:
     def __init__(self, delay_range: Tuple[float, float] = (0.05, 0.1), 
-                 failure_rate: float = 0.0, visualizer=None):
+                 failure_rate: float = 0.0, visualizer=None, clock: Optional[EventClock] = None,
+                 rng=None):
         self.nodes = {}  # Store actual node objects
+        # Node ids per role, filled in by register_node from node.ROLE so fan-out needs no scans
+        self.proposers = []
+        self.acceptors = []
+        self.learners = []
+        self.acceptor_bits = {}  # acceptor id -> 1 << acceptor_index, for received-from bitmasks
+        self.running_acceptors = []  # Live acceptors, kept up to date by PaxosAcceptor.running
         self.delay_range = delay_range
         self.failure_rate = failure_rate
         self.running = True
@@ -33,134 +113,289 @@ class NetworkSimulator:
         self.dropped_messages = 0
         self.visualizer = visualizer
         self.max_retries = 3  # Maximum number of retries for dropped messages
-        self.active_messages = set()  # Track active messages to prevent duplicates
-        self.message_lock = threading.Lock()  # Add lock for thread safety
-        self.message_queue = queue.Queue()  # Add message queue for ordered processing
+        # In-flight message ids; single dict operations are atomic, so the send path needs no lock
+        self.active_messages = {}
+        self._msg_counter = itertools.count(1)
+        self._drop_counter = itertools.count(1)
+        self._retry_counter = itertools.count(1)
         self.total_retries = 0
+        self.on_empty = None  # Called when the last in-flight message is settled
+        self.deferred = 0  # node handlers queued through defer() that have not run yet
+        self.clock = clock  # Virtual time when set, wall clock and threads otherwise
+        self.rng = rng  # Optional numpy Generator for reproducible drops and delays
+        self._drops = None
+        self._drop_idx = 0
+        self._delays = None  # unit draws, scaled to delay_range on use so it can change between runs
+        self._delay_idx = 0
+        # Real-time deliveries, retries and timeouts share one scheduler thread
+        self._timer_heap = []  # heap of (due, seq, fn, args) on the monotonic clock
+        self._timer_cv = threading.Condition()
+        self._seq = itertools.count()
+        self._timer_thread = None
+        
+    def now(self):
+        return self.clock.now() if self.clock is not None else time.perf_counter()
+        
+    def call_later(self, delay, fn, *args):
+        """Run fn(*args) after delay seconds of simulated or real time"""
+        self.call_many(((delay, args),), fn)
+        
+    def call_many(self, entries, fn):
+        """Schedule fn(*args) for every (delay, args) entry under one lock and one wake-up"""
+        if self.clock is not None:
+            for delay, args in entries:
+                self.clock.schedule(delay, fn, *args)
+            return
+        with self._timer_cv:
+            now = time.monotonic()
+            heap, seq = self._timer_heap, self._seq
+            for delay, args in entries:
+                heapq.heappush(heap, (now + delay, next(seq), fn, args))
+            if self._timer_thread is None:
+                self._timer_thread = threading.Thread(target=self._timer_loop, daemon=True)
+                self._timer_thread.start()
+            self._timer_cv.notify()
+            
+    def _timer_loop(self):
+        """Run scheduled callbacks as they fall due until the simulator stops"""
+        heap, cv = self._timer_heap, self._timer_cv
+        while True:
+            with cv:
+                while self.running and (not heap or heap[0][0] > time.monotonic()):
+                    cv.wait(heap[0][0] - time.monotonic() if heap else None)
+                if not self.running:
+                    heap.clear()
+                    self._timer_thread = None
+                    return
+                _, _, fn, args = heapq.heappop(heap)
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception("Error in scheduled callback")
+        
+    def pending(self):
+        """Number of messages still in flight (including pending retries and deferred handlers)"""
+        return len(self.active_messages) + self.deferred
+        
+    def defer(self, fn, msg: NetworkMessage):
+        """Run fn(msg) from the scheduler once the current delivery returns; counts as pending until then"""
+        self.deferred += 1
+        self.call_later(0.0, self._run_deferred, fn, msg)
+        
+    def _run_deferred(self, fn, msg: NetworkMessage):
+        try:
+            fn(msg)
+        finally:
+            self.deferred -= 1
+            if not self.deferred and not self.active_messages and self.on_empty is not None:
+                self.on_empty()
+        
+    def _settle(self, msg_id):
+        """Forget an in-flight message"""
+        if self.active_messages.pop(msg_id, None) is not None:
+            if not self.active_messages and not self.deferred and self.on_empty is not None:
+                self.on_empty()
+        
+    def should_drop(self):
+        """Decide whether the next message is lost"""
+        if self.rng is None:
+            return random.random() < self.failure_rate
+        if self._drops is None or self._drop_idx >= len(self._drops):
+            self._drops = self.rng.random(DROP_BUFFER)
+            self._drop_idx = 0
+        v = self._drops[self._drop_idx]
+        self._drop_idx += 1
+        return v < self.failure_rate
+        
+    def draw_delays(self, n):
+        """Next n network delays, taken from the pre-drawn buffer when a numpy rng is supplied"""
+        lo, hi = self.delay_range
+        if self.rng is None:
+            return [random.uniform(lo, hi) for _ in range(n)]
+        if self._delays is None or self._delay_idx + n > len(self._delays):
+            self._delays = self.rng.random(max(DELAY_BUFFER, n))
+            self._delay_idx = 0
+        i = self._delay_idx
+        self._delay_idx = i + n
+        return lo + (hi - lo) * self._delays[i:i + n]
+        
+    def reset(self, rng=None):
+        """Clear counters and in-flight state so the simulator can be reused for another run"""
+        self.running = True
+        self.rng = rng
+        self._drops = None
+        self._delays = None
+        self.message_count = 0
+        self.dropped_messages = 0
+        self.total_retries = 0
+        self._msg_counter = itertools.count(1)
+        self._drop_counter = itertools.count(1)
+        self._retry_counter = itertools.count(1)
+        self.active_messages.clear()
+        self.deferred = 0
+        if self.clock is not None:
+            self.clock.reset()
+        with self._timer_cv:
+            self._timer_heap.clear()
         
     def register_node(self, node: 'PaxosNode'):
         """Register a node with the network simulator"""
         self.nodes[node.node_id] = node
+        role = node.ROLE
+        if role == 'proposer':
+            self.proposers.append(node.node_id)
+        elif role == 'acceptor':
+            node.acceptor_index = len(self.acceptors)
+            self.acceptor_bits[node.node_id] = 1 << node.acceptor_index
+            self.acceptors.append(node.node_id)
+        elif role == 'learner':
+            self.learners.append(node.node_id)
         
-    def send_message(self, msg: NetworkMessage, retry_count=0):
-        if not self.running:
+    def send_message(self, msg: NetworkMessage):
+        """Send msg; the network owns it from here and releases it once it has been consumed"""
+        if not self._admit(msg):
             return
+        
+        # Visualize message if visualizer is available; once scheduled, msg may be delivered and reused
+        if self.visualizer:
+            self.visualizer.draw_message(msg)
+            self.visualizer.log_message(f"Message sent: {msg.msg_type} from {msg.sender} to {msg.receiver}")
+        
+        # Simulate network delay
+        delay = self.draw_delays(1)[0]
+        self.call_later(delay, self._deliver_message, msg)
             
-        # Create a unique identifier for this message
-        msg_id = f"{msg.sender}-{msg.receiver}-{msg.msg_type}-{msg.proposal_id}-{retry_count}"
+    def broadcast(self, msg_type: str, sender: str, receivers: List[str], proposal_id: ProposalID,
+                  accepted_value: Optional[str] = None):
+        """Send one message per receiver, drawing delays and scheduling deliveries in a single batch"""
+        sent = []
+        retries = []  # (delay, args) for dropped copies, scheduled together below
+        for receiver in receivers:
+            msg = NetworkMessage.acquire(msg_type, sender, receiver, proposal_id, accepted_value=accepted_value)
+            if self._admit(msg, retries):
+                sent.append(msg)
+        if retries:
+            self.call_many(retries, self._retry_message)
+        if not sent:
+            return
         
-        with self.message_lock:
-            # Skip if this message is already being processed
-            if msg_id in self.active_messages:
-                return
+        # Draw before scheduling: a delivered message goes back to the pool and may be reused
+        if self.visualizer:
+            for msg in sent:
+                self.visualizer.draw_message(msg)
+                self.visualizer.log_message(f"Message sent: {msg.msg_type} from {msg.sender} to {msg.receiver}")
+        
+        delays = self.draw_delays(len(sent))
+        self.call_many([(delay, (msg,)) for delay, msg in zip(delays, sent)], self._deliver_message)
                 
-            self.active_messages.add(msg_id)
-            self.message_count += 1
+    def _admit(self, msg: NetworkMessage, retries=None):
+        """Register msg as in flight and decide whether it is dropped; returns True if it should be delivered"""
+        if not self.running:
+            NetworkMessage.release(msg)
+            return False
             
-            # Only simulate message loss if failure rate is greater than 0
-            if self.failure_rate > 0 and random.random() < self.failure_rate:
-                self.dropped_messages += 1
-                msg.dropped = True
+        self.active_messages[msg.id] = msg
+        retry_count = msg.retries
+        self.message_count = next(self._msg_counter)
+        
+        # Only simulate message loss if failure rate is greater than 0
+        if self.failure_rate > 0 and self.should_drop():
+            self.dropped_messages = next(self._drop_counter)
+            msg.dropped = True
+            
+            if self.visualizer:
+                self.visualizer.log_message(f"Message dropped: {msg.msg_type} from {msg.sender} to {msg.receiver}")
+                self.visualizer.draw_message(msg)
+                
+            # Skip retries if failure rate is 100%
+            if self.failure_rate >= 1.0:
+                self._settle(msg.id)
+                NetworkMessage.release(msg)
+                return False
                 
+            # Retry logic for dropped messages
+            if retry_count < self.max_retries:
                 if self.visualizer:
-                    self.visualizer.log_message(f"Message dropped: {msg.msg_type} from {msg.sender} to {msg.receiver}")
-                    self.visualizer.draw_message(msg)
-                    
-                # Skip retries if failure rate is 100%
-                if self.failure_rate >= 1.0:
-                    self.active_messages.remove(msg_id)
-                    return
-                    
-                # Retry logic for dropped messages
-                if retry_count < self.max_retries:
-                    if self.visualizer:
-                        self.visualizer.log_message(f"Retrying message (attempt {retry_count + 1}/{self.max_retries})")
-                    # Schedule retry with exponential backoff
-                    delay = min(0.5 * (2 ** retry_count), 5.0)  # Up to 5s delay
-                    threading.Timer(delay, self._retry_message, args=[msg_id, msg.sender, msg.receiver, msg, retry_count + 1]).start()
+                    self.visualizer.log_message(f"Retrying message (attempt {retry_count + 1}/{self.max_retries})")
+                # Schedule retry with exponential backoff
+                delay = min(0.5 * (2 ** retry_count), 5.0)  # Up to 5s delay
+                msg.retries = retry_count + 1
+                if retries is None:  # broadcast passes a list and schedules its retries in one batch
+                    self.call_later(delay, self._retry_message, msg)
                 else:
-                    if self.visualizer:
-                        self.visualizer.log_message(f"Message permanently dropped after {self.max_retries} retries")
-                    self.active_messages.remove(msg_id)
-                return
-                
-            msg.dropped = False
-            
-            # Simulate network delay
-            delay = random.uniform(*self.delay_range)
-            if delay == 0.0:
-                threading.Thread(target=self._deliver_message, args=(msg, msg_id), daemon=True).start()
+                    retries.append((delay, (msg,)))
             else:
-                threading.Thread(
-                    target=self._delayed_delivery,
-                    args=(msg, msg_id, delay),
-                    daemon=True
-                ).start()
+                if self.visualizer:
+                    self.visualizer.log_message(f"Message permanently dropped after {self.max_retries} retries")
+                self._settle(msg.id)
+                NetworkMessage.release(msg)
+            return False
             
-            # Visualize message if visualizer is available
-            if self.visualizer:
-                self.visualizer.draw_message(msg)
-                self.visualizer.log_message(f"Message sent: {msg.msg_type} from {msg.sender} to {msg.receiver}")
+        msg.dropped = False
+        return True
 
-    def _retry_message(self, msg_id, from_node, to_node, message, attempt=0):
+    def _retry_message(self, message: NetworkMessage):
+        msg_id = message.id
         try:
-            with self.message_lock:  # Use lock when modifying shared state
-                if not self.running or attempt >= 3:  # Don't retry if simulator is stopped
-                    if msg_id in self.active_messages:
-                        self.active_messages.remove(msg_id)
-                    return
+            if not self.running or message.retries >= 3:  # Don't retry if simulator is stopped
+                self._settle(msg_id)
+                NetworkMessage.release(message)
+                return
 
-                if msg_id not in self.active_messages:  # Message already delivered
-                    return
+            if msg_id not in self.active_messages:  # Message already delivered
+                return
 
-                # Simulate message drop
-                if random.random() < self.failure_rate:
-                    self.total_retries += 1  
-                    self.dropped_messages += 1
-                    # Schedule retry with exponential backoff
-                    delay = min(0.1 * (2 ** attempt), 1.0)  # Cap maximum delay at 1 second
-                    threading.Timer(delay, self._retry_message, 
-                                 args=[msg_id, from_node, to_node, message, attempt + 1]).start()
-                    return
+            # Simulate message drop
+            if self.should_drop():
+                self.total_retries = next(self._retry_counter)
+                self.dropped_messages = next(self._drop_counter)
+                # Schedule retry with exponential backoff
+                delay = min(0.1 * (2 ** message.retries), 1.0)  # Cap maximum delay at 1 second
+                message.retries += 1
+                self.call_later(delay, self._retry_message, message)
+                return
 
-                # Deliver message if not dropped and node exists and is running
-                if to_node in self.nodes:
-                    # Get the actual node from the nodes dictionary
-                    target_node = self.nodes[to_node]
-                    if target_node.running:
-                        target_node.handle_message(message)
-                
-                self.active_messages.remove(msg_id)
+            # Deliver message if not dropped and node exists and is running
+            target_node = self.nodes.get(message.receiver)
+            if target_node is not None and target_node.running:
+                target_node.handle_message(message)  # the node releases it
+            else:
+                NetworkMessage.release(message)
+            
+            self._settle(msg_id)
 
         except Exception as e:
             logging.error(f"Error in _retry_message: {e}")
-            with self.message_lock:
-                if msg_id in self.active_messages:
-                    self.active_messages.remove(msg_id)
+            self._settle(msg_id)
         
-    def _deliver_message(self, msg: NetworkMessage, msg_id: str):
+    def _deliver_message(self, msg: NetworkMessage):
         """Deliver a message to its destination node"""
+        msg_id = msg.id  # read before handing msg on; the node may recycle it
+        delivered = False
         try:
-            if msg.receiver in self.nodes:
-                target_node = self.nodes[msg.receiver]
-                if target_node.running:
-                    target_node.handle_message(msg)
+            target_node = self.nodes.get(msg.receiver)
+            if target_node is not None and target_node.running:
+                delivered = True
+                target_node.handle_message(msg)  # the node releases it
         finally:
-            with self.message_lock:
-                if msg_id in self.active_messages:
-                    self.active_messages.remove(msg_id)
+            self._settle(msg_id)
+            if not delivered:
+                NetworkMessage.release(msg)
             
-    def _delayed_delivery(self, msg, msg_id, delay):
-        time.sleep(delay)
-        self._deliver_message(msg, msg_id)
-
     def stop(self):
-        self.running = False
+        with self._timer_cv:
+            self.running = False
+            self._timer_cv.notify()
+        for node in self.nodes.values():
+            node.stop()
         if self.visualizer:
             self.visualizer.log_message(f"Network stats: {self.message_count} messages sent, {self.dropped_messages} dropped")
         self.active_messages.clear()
+        self.deferred = 0
 
 class PaxosNode:
+    ROLE = None  # 'proposer', 'acceptor' or 'learner'; the network groups nodes by it
+    
     def __init__(self, node_id: str, network: NetworkSimulator):
         self.node_id = node_id
         self.network = network
@@ -172,11 +407,41 @@ class PaxosNode:
         """Start the node's message processing"""
         self.running = True
         
+    def stop(self):
+        """Stop the node"""
+        self.running = False
+        
+    def reset(self):
+        """Return the node to its freshly constructed state"""
+        self.running = True
+        self.message_timeouts.clear()
+        
+    def _dispatch(self, msg: NetworkMessage):
+        """Process a message the network scheduler handed back to us"""
+        if self.running:  # a crashed node ignores whatever was still queued for it
+            self._process(msg)
+        else:
+            NetworkMessage.release(msg)
+        
     def handle_message(self, msg: NetworkMessage):
         """Handle an incoming message - to be implemented by subclasses"""
         raise NotImplementedError
 
+class PhaseState:
+    """Progress of one prepare or accept phase of a proposer"""
+    __slots__ = ('proposal_id', 'count', 'start_time', 'received_mask', 'value', 'retry_count')
+    
+    def __init__(self, proposal_id: ProposalID, start_time: float, value=None):
+        self.proposal_id = proposal_id
+        self.count = 0
+        self.start_time = start_time
+        self.received_mask = 0  # one bit per acceptor, see network.acceptor_bits
+        self.value = value
+        self.retry_count = 0
+
 class PaxosProposer(PaxosNode, Proposer):
+    ROLE = 'proposer'
+    
     def __init__(self, node_id: str, network: NetworkSimulator, quorum_size: int):
         PaxosNode.__init__(self, node_id, network)
         Proposer.__init__(self)
@@ -184,21 +449,41 @@ class PaxosProposer(PaxosNode, Proposer):
         self.proposer_uid = node_id
         self.quorum_size = quorum_size
         self.next_proposal_number = 1
-        self.pending_promises = {}  # Track pending promises
+        self._promise_state = None  # PhaseState of the prepare phase awaiting promises
         self.timeout = 4.0  # Reduced timeout to 4 seconds
-        self.pending_accepts = {}  # Track pending accept requests
+        self._accept_state = None  # PhaseState of the accept phase awaiting accepteds
         self.current_phase = None  # Track current phase: 'prepare' or 'accept'
-        self.phase_lock = threading.RLock()  # Lock to ensure phase ordering
+        self.phase_lock = threading.Lock()  # Lock to ensure phase ordering
         self.proposal_value = None  # Store the current proposal value
-        self.message_queue = queue.Queue()  # Add message queue for ordered processing
-        self.processing_thread = None
-        self.processed_messages = set()  # Track processed messages to prevent duplicates
+        # Latest proposal seen per sender; repeats are idempotent, so this is all dedupe needs
+        self._last_promise_from = {}
+        self._last_accepted_from = {}
         self.quorum_reached = False  # Track if quorum has been reached
         self.proposal_id = None  # Track current proposal ID
         self.consensus_time = None  # Track when consensus is reached
+        self.consensus_event = threading.Event()  # Set together with consensus_time
         self.start_time = None  # Track when the proposal starts
         self.rounds = 0  # Track the number of rounds
         
+    def reset(self):
+        PaxosNode.reset(self)
+        self.next_proposal_number = 1
+        self._promise_state = None
+        self._accept_state = None
+        self.current_phase = None
+        self.proposal_value = None
+        self.proposed_value = None
+        self.last_accepted_id = None
+        self.promises_mask = 0
+        self._last_promise_from.clear()
+        self._last_accepted_from.clear()
+        self.quorum_reached = False
+        self.proposal_id = None
+        self.consensus_time = None
+        self.consensus_event.clear()
+        self.start_time = None
+        self.rounds = 0
+        
     def set_proposal(self, value):
         """Set the proposal value"""
         self.proposal_value = value
@@ -215,49 +500,41 @@ class PaxosProposer(PaxosNode, Proposer):
             self.next_proposal_number += 1
             self.proposal_id = ProposalID(self.next_proposal_number, self.proposer_uid)
             if self.start_time is None:  # Only set once
-                self.start_time = time.time()
+                self.start_time = self.network.now()
             
             # Initialize base class state
-            self.promises_rcvd = set()
+            self.promises_mask = 0  # one bit per acceptor, see network.acceptor_bits
             self.last_accepted_id = None
             
             # Send prepare messages to all acceptors
-            for node_id, node in self.network.nodes.items():
-                if isinstance(node, PaxosAcceptor):
-                    self.network.send_message(NetworkMessage('prepare', self.node_id, node_id, self.proposal_id))
+            self.network.broadcast('prepare', self.node_id, self.network.acceptors, self.proposal_id)
             
             # Start timeout for promises
-            self.pending_promises[self.proposal_id] = {
-                'count': 0,
-                'start_time': time.time(),
-                'received': set(),
-                'value': None,
-                'retry_count': 0
-            }
+            self._promise_state = PhaseState(self.proposal_id, self.network.now())
             # Start timeout timer
-            threading.Timer(self.timeout, self._check_promise_timeout, args=[self.proposal_id]).start()
+            self.network.call_later(self.timeout, self._check_promise_timeout, self.proposal_id)
         
     def _check_promise_timeout(self, proposal_id):
-        if proposal_id not in self.pending_promises:
-            return
-            
+        retry = False
         with self.phase_lock:
-            promises = self.pending_promises[proposal_id]
-            if promises['count'] < self.quorum_size:
+            promises = self._promise_state
+            if promises is not None and promises.proposal_id == proposal_id and promises.count < self.quorum_size:
                 # Not enough promises received, try again with higher number
-                promises['retry_count'] += 1
-                if promises['retry_count'] < 3:  # Max 3 retries
+                promises.retry_count += 1
+                if promises.retry_count < 3:  # Max 3 retries
                     self.next_proposal_number += 1
                     new_proposal_id = ProposalID(self.next_proposal_number, self.proposer_uid)
                     # Clear current phase before retrying
                     self.current_phase = None
-                    self.prepare()
+                    retry = True
                 else:
                     # Too many retries, give up
                     if self.network.visualizer:
-                        self.network.visualizer.log_message(f"Proposer {self.node_id} failed to get quorum after {promises['retry_count']} attempts")
-                    del self.pending_promises[proposal_id]
+                        self.network.visualizer.log_message(f"Proposer {self.node_id} failed to get quorum after {promises.retry_count} attempts")
+                    self._promise_state = None
                     self.current_phase = None
+        if retry:
+            self.prepare()
         
     def send_accept(self, proposal_id, proposal_value):
         """Send accept messages to all acceptors"""
@@ -267,95 +544,88 @@ class PaxosProposer(PaxosNode, Proposer):
         with self.phase_lock:
             # Only send accept if prepare phase is complete and quorum was reached
             if not self.quorum_reached:
-                logger.warning(f"{self.node_id} cannot send accept - quorum not reached")
+                logger.warning("%s cannot send accept - quorum not reached", self.node_id)
                 return
 
                 
-            logger.info(f"{self.node_id} sending accept messages with value: {proposal_value}")
+            logger.info("%s sending accept messages with value: %s", self.node_id, proposal_value)
             self.current_phase = 'accept'
-            for node_id, node in self.network.nodes.items():
-                if isinstance(node, PaxosAcceptor):
-                    logger.info(f"{self.node_id} sending accept to {node_id}")
-                    self.network.send_message(NetworkMessage('accept', self.node_id, node_id, 
-                                                            proposal_id, accepted_value=proposal_value))
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("%s sending accept to %s", self.node_id, ', '.join(self.network.acceptors))
+            self.network.broadcast('accept', self.node_id, self.network.acceptors, proposal_id,
+                                   accepted_value=proposal_value)
             # Track accept request
-            self.pending_accepts[proposal_id] = {
-                'count': 0,
-                'start_time': time.time(),
-                'received': set(),
-                'value': proposal_value,
-                'retry_count': 0
-            }
+            self._accept_state = PhaseState(proposal_id, self.network.now(), proposal_value)
             # Start timeout timer
-            threading.Timer(self.timeout, self._check_accept_timeout, args=[proposal_id]).start()
+            self.network.call_later(self.timeout, self._check_accept_timeout, proposal_id)
         
     def _check_accept_timeout(self, proposal_id):
-        if proposal_id not in self.pending_accepts:
-            return
+        resend = restart = False
         with self.phase_lock:
-            accepts = self.pending_accepts[proposal_id]
-            if accepts['count'] < self.quorum_size:
-                accepts['retry_count'] += 1
-                if accepts['retry_count'] < 3:
+            accepts = self._accept_state
+            if accepts is not None and accepts.proposal_id == proposal_id and accepts.count < self.quorum_size:
+                accepts.retry_count += 1
+                if accepts.retry_count < 3:
                     self.rounds += 1  # Increment rounds on accept retry
-                    self.send_accept(proposal_id, accepts['value'])
+                    value = accepts.value
+                    resend = True
                 else:
                     # Too many retries, give up and start over with prepare phase
                     self.current_phase = None
                     self.next_proposal_number += 1
-                    self.prepare()
+                    restart = True
+        # Re-enter through the public entry points, which take the lock themselves
+        if resend:
+            self.send_accept(proposal_id, value)
+        elif restart:
+            self.prepare()
         
-    def start(self):
-        """Start the node's message processing"""
-        self.running = True
-        self.processing_thread = threading.Thread(target=self._process_messages)
-        self.processing_thread.daemon = True
-        self.processing_thread.start()
-        
-    def _process_messages(self):
-        """Process messages in order"""
-        while self.running:
-            try:
-                msg = self.message_queue.get(timeout=0.1)
-                # Create unique message identifier
-                msg_id = f"{msg.sender}-{msg.msg_type}-{msg.proposal_id}"
-                
-                # Skip if already processed
-                if msg_id in self.processed_messages:
-                    logger.info(f"{self.node_id} skipping duplicate message from {msg.sender}")
-                    continue
-                    
-                self.processed_messages.add(msg_id)
+    def _process(self, msg: NetworkMessage):
+        try:
+            if msg.msg_type == 'promise':
+                last_seen = self._last_promise_from
+            elif msg.msg_type == 'accepted':
+                last_seen = self._last_accepted_from
+            else:
+                return
                 
-                if msg.msg_type == 'promise':
-                    logger.info(f"{self.node_id} processing promise from {msg.sender}")
-                    self.handle_promise(msg)
-                elif msg.msg_type == 'accepted':
-                    logger.info(f"{self.node_id} processing accepted from {msg.sender}")
-                    self.handle_accepted(msg)
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.error(f"Error processing message in {self.node_id}: {e}")
+            # Skip if already processed
+            if last_seen.get(msg.sender) == msg.proposal_id:
+                logger.info("%s skipping duplicate message from %s", self.node_id, msg.sender)
+                return
+            last_seen[msg.sender] = msg.proposal_id
+            
+            if msg.msg_type == 'promise':
+                logger.info("%s processing promise from %s", self.node_id, msg.sender)
+                self.handle_promise(msg)
+            elif msg.msg_type == 'accepted':
+                logger.info("%s processing accepted from %s", self.node_id, msg.sender)
+                self.handle_accepted(msg)
+        except Exception as e:
+            logger.error(f"Error processing message in {self.node_id}: {e}")
+        finally:
+            NetworkMessage.release(msg)
                 
     def handle_promise(self, msg: NetworkMessage):
         """Handle a promise message"""
+        should_accept = False
         with self.phase_lock:
-            if msg.proposal_id in self.pending_promises and self.current_phase == 'prepare':
-                promises = self.pending_promises[msg.proposal_id]
+            promises = self._promise_state
+            if promises is not None and promises.proposal_id == msg.proposal_id and self.current_phase == 'prepare':
                 
                 # Skip if we already received a promise from this acceptor
-                if msg.sender in promises['received']:
-                    logger.info(f"{self.node_id} skipping duplicate promise from {msg.sender}")
+                bit = self.network.acceptor_bits[msg.sender]
+                if promises.received_mask & bit:
+                    logger.info("%s skipping duplicate promise from %s", self.node_id, msg.sender)
                     return
                     
-                promises['count'] += 1
-                promises['received'].add(msg.sender)
+                promises.received_mask |= bit
+                promises.count = promises.received_mask.bit_count()
                 
                 # Track highest accepted value
                 if msg.accepted_value is not None:
-                    if promises['value'] is None or msg.previous_id > promises['value'][0]:
-                        promises['value'] = (msg.previous_id, msg.accepted_value)
+                    if promises.value is None or msg.previous_id > promises.value[0]:
+                        promises.value = (msg.previous_id, msg.accepted_value)
                 
                 # Call the base class method to update state
                 try:
@@ -365,168 +635,221 @@ class PaxosProposer(PaxosNode, Proposer):
                         if msg.accepted_value is not None:
                             self.proposed_value = msg.accepted_value
                     
-                    # Add to promises received set
-                    if not hasattr(self, 'promises_rcvd'):
-                        self.promises_rcvd = set()
-                    self.promises_rcvd.add(msg.sender)
+                    # Add to promises received this round
+                    self.promises_mask |= bit
+                    received = self.promises_mask.bit_count()
                     
                     # Check if we have enough promises
-                    if len(self.promises_rcvd) >= self.quorum_size and not self.quorum_reached:
-                        logger.info(f"{self.node_id} received quorum of promises ({len(self.promises_rcvd)})")
+                    if received >= self.quorum_size and not self.quorum_reached:
+                        logger.info("%s received quorum of promises (%s)", self.node_id, received)
                         self.quorum_reached = True
                         # Use highest accepted value if any, otherwise use our own
-                        if promises['value'] is not None:
-                            value = promises['value'][1]
+                        if promises.value is not None:
+                            value = promises.value[1]
                         else:
                             value = self.proposal_value
-                        # Move to accept phase
-                        self.send_accept(msg.proposal_id, value)
-                        del self.pending_promises[msg.proposal_id]
+                        pid = msg.proposal_id
+                        self._promise_state = None
+                        should_accept = True
                 except Exception as e:
                     logger.error(f"Error in handle_promise: {e}")
                     return
+        # Move to accept phase; send_accept takes the lock itself
+        if should_accept:
+            self.send_accept(pid, value)
                 
     def handle_accepted(self, msg: NetworkMessage):
         """Handle an accepted message"""
         with self.phase_lock:
-            if msg.proposal_id in self.pending_accepts and self.current_phase == 'accept':
-                accepts = self.pending_accepts[msg.proposal_id]
+            accepts = self._accept_state
+            if accepts is not None and accepts.proposal_id == msg.proposal_id and self.current_phase == 'accept':
                 
                 # Skip if we already received an accept from this acceptor
-                if msg.sender in accepts['received']:
-                    logger.info(f"{self.node_id} skipping duplicate accept from {msg.sender}")
+                bit = self.network.acceptor_bits[msg.sender]
+                if accepts.received_mask & bit:
+                    logger.info("%s skipping duplicate accept from %s", self.node_id, msg.sender)
                     return
                     
-                accepts['count'] += 1
-                accepts['received'].add(msg.sender)
-                logger.info(f"{self.node_id} received accept from {msg.sender}, total accepts: {accepts['count']}")
+                accepts.received_mask |= bit
+                accepts.count = accepts.received_mask.bit_count()
+                logger.info("%s received accept from %s, total accepts: %s", self.node_id, msg.sender, accepts.count)
                 
                 # Check if we have enough accepts
-                if accepts['count'] >= self.quorum_size:
+                if accepts.count >= self.quorum_size:
                     if self.consensus_time is None:
-                        logger.info(f"{self.node_id} received quorum of accepts ({accepts['count']})")
-                        self.consensus_time = time.time()
+                        logger.info("%s received quorum of accepts (%s)", self.node_id, accepts.count)
+                        self.consensus_time = self.network.now()
+                        self.consensus_event.set()
                         if self.start_time is not None:
                             consensus_duration = self.consensus_time - self.start_time
-                            logger.info(f"Consensus reached in {consensus_duration:.6f} seconds")
+                            logger.info("Consensus reached in %.6f seconds", consensus_duration)
                         if self.network.visualizer:
                             self.network.visualizer.log_message(
-                                f"Proposer {self.node_id} achieved consensus with value: {accepts['value']}"
+                                f"Proposer {self.node_id} achieved consensus with value: {accepts.value}"
                             )
-                    del self.pending_accepts[msg.proposal_id]
+                    self._accept_state = None
                     self.current_phase = None
         
     def handle_message(self, msg: NetworkMessage):
         """Queue the message for ordered processing"""
         if not self.running:
+            NetworkMessage.release(msg)
             return
-        self.message_queue.put(msg)
-        logger.info(f"{self.node_id} queued {msg.msg_type} message from {msg.sender}")
+        logger.info("%s queued %s message from %s", self.node_id, msg.msg_type, msg.sender)
+        # Defer to the network scheduler so handlers run in event order, not nested inside the sender;
+        # the network keeps counting it as pending until the handler has run
+        self.network.defer(self._dispatch, msg)
 
 class PaxosAcceptor(PaxosNode, Acceptor):
+    ROLE = 'acceptor'
+    
     def __init__(self, node_id: str, network: NetworkSimulator):
         PaxosNode.__init__(self, node_id, network)
         Acceptor.__init__(self)
         self.messenger = self
         self.pending_responses = {}  # Track pending responses
-        self.message_queue = queue.Queue()  # Add message queue for ordered processing
-        self.processing_thread = None
+        self.phase_done = threading.Event()  # Set whenever a prepare/accept has been handled
+        # Deliveries run on the network scheduler while drivers may call recv_* directly
+        self._state_lock = threading.Lock()
+        
+    @property
+    def running(self):
+        return self._running
+        
+    @running.setter
+    def running(self, value):
+        # Keep the network's list of live acceptors in step with crashes and restarts
+        self._running = value
+        live = self.network.running_acceptors
+        if value:
+            if self not in live:
+                live.append(self)
+        elif self in live:
+            live.remove(self)
+        
+    def reset(self):
+        PaxosNode.reset(self)
+        self.promised_id = None
+        self.accepted_id = None
+        self.accepted_value = None
+        self.pending_responses.clear()
+        self.phase_done.clear()
+        
+    def recv_prepare(self, proposer_uid, proposal_id):
+        """Override and call base implementation"""
+        with self._state_lock:
+            super().recv_prepare(proposer_uid, proposal_id)
+        self.phase_done.set()
         
     def recv_accept_request(self, proposer_uid, proposal_id, value):
         """Override and call base implementation"""
-        logger.info(f"{self.node_id} received accept request from {proposer_uid} with value: {value}")
-        super().recv_accept_request(proposer_uid, proposal_id, value)
-        logger.info(f"{self.node_id} processed accept request from {proposer_uid}")
+        logger.info("%s received accept request from %s with value: %s", self.node_id, proposer_uid, value)
+        with self._state_lock:
+            super().recv_accept_request(proposer_uid, proposal_id, value)
+        logger.info("%s processed accept request from %s", self.node_id, proposer_uid)
+        self.phase_done.set()
         
-    def start(self):
-        """Start the node's message processing"""
-        self.running = True
-        self.processing_thread = threading.Thread(target=self._process_messages)
-        self.processing_thread.daemon = True
-        self.processing_thread.start()
+    def recv_prepare_and_accept(self, proposer_uid, proposal_id, value):
+        """Handle a prepare with a piggybacked accept request in one pass"""
+        with self._state_lock:
+            super().recv_prepare(proposer_uid, proposal_id)
+            # Only accept if the promise went through for this very proposal
+            if self.promised_id == proposal_id:
+                super().recv_accept_request(proposer_uid, proposal_id, value)
+        self.phase_done.set()
         
-    def _process_messages(self):
-        """Process messages in order"""
-        while self.running:
-            try:
-                msg = self.message_queue.get(timeout=0.1)
-                if msg.msg_type == 'prepare':
-                    logger.info(f"{self.node_id} processing prepare message from {msg.sender}")
-                    self.recv_prepare(msg.sender, msg.proposal_id)
-                elif msg.msg_type == 'accept':
-                    logger.info(f"{self.node_id} processing accept message from {msg.sender}")
-                    self.recv_accept_request(msg.sender, msg.proposal_id, msg.accepted_value)
-            except queue.Empty:
-                continue
-            except Exception as e:
-                logger.error(f"Error processing message in {self.node_id}: {e}")
+    def _process(self, msg: NetworkMessage):
+        try:
+            if msg.msg_type == 'prepare':
+                logger.info("%s processing prepare message from %s", self.node_id, msg.sender)
+                self.recv_prepare(msg.sender, msg.proposal_id)
+            elif msg.msg_type == 'accept':
+                logger.info("%s processing accept message from %s", self.node_id, msg.sender)
+                self.recv_accept_request(msg.sender, msg.proposal_id, msg.accepted_value)
+        except Exception as e:
+            logger.error(f"Error processing message in {self.node_id}: {e}")
+        finally:
+            NetworkMessage.release(msg)
         
     def send_promise(self, to_uid, proposal_id, previous_id, accepted_value):
         if not self.running:
             return
-        logger.info(f"{self.node_id} sending promise to {to_uid} for proposal {proposal_id}")
-        msg = NetworkMessage('promise', self.node_id, to_uid, 
-                           proposal_id, previous_id, accepted_value)
+        logger.info("%s sending promise to %s for proposal %s", self.node_id, to_uid, proposal_id)
+        msg = NetworkMessage.acquire('promise', self.node_id, to_uid, 
+                                     proposal_id, previous_id, accepted_value)
         self.network.send_message(msg)
         
     def send_accepted(self, proposal_id, accepted_value):
         """Send accepted messages to all learners and proposers"""
-        for node_id, node in self.network.nodes.items():
-            if isinstance(node, PaxosLearner) or isinstance(node, PaxosProposer):
-                logger.info(f"{self.node_id} sending accepted to {node_id} for proposal {proposal_id}")
-                msg = NetworkMessage(
-                    'accepted',
-                    sender=self.node_id,
-                    receiver=node_id,
-                    proposal_id=proposal_id,
-                    accepted_value=accepted_value 
-                )
-                self.network.send_message(msg)
+        receivers = self.network.proposers + self.network.learners
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s sending accepted to %s for proposal %s", self.node_id, ', '.join(receivers), proposal_id)
+        self.network.broadcast('accepted', self.node_id, receivers, proposal_id, accepted_value=accepted_value)
         
     def handle_message(self, msg: NetworkMessage):
-        """Queue the message for ordered processing"""
+        """Handle the message right away; the promise-max rule makes replies safe in any order"""
         if not self.running:
+            NetworkMessage.release(msg)
             return
-        self.message_queue.put(msg)
-        logger.info(f"{self.node_id} queued {msg.msg_type} message from {msg.sender}")
+        # Only called from scheduled deliveries, so this never runs nested inside the sender
+        self._process(msg)
 
 class PaxosLearner(PaxosNode, Learner):
+    ROLE = 'learner'
+    
     def __init__(self, node_id: str, network: NetworkSimulator, quorum_size: int):
         PaxosNode.__init__(self, node_id, network)
         Learner.__init__(self)
         self.messenger = self
         self.quorum_size = quorum_size
         self.pending_accepted = {}  # Track pending accepted messages
+        self.phase_done = threading.Event()  # Set once this learner has decided
+        
+    def reset(self):
+        PaxosNode.reset(self)
+        self.proposals = None
+        self.acceptors = None
+        self.final_value = None
+        self.final_proposal_id = None
+        self.pending_accepted.clear()
+        self.phase_done.clear()
         
     def on_resolution(self, proposal_id, value):
         if self.network.visualizer:
             self.network.visualizer.log_message(f"Learner {self.node_id} reached consensus: {value}")
+        self.phase_done.set()
         
     def handle_message(self, msg: NetworkMessage):
-        if msg.msg_type == 'accepted':
-            if msg.proposal_id not in self.pending_accepted:
-                self.pending_accepted[msg.proposal_id] = {
-                    'count': 0,
-                    'value': msg.accepted_value,
-                    'received': set()
-                }
-            
-            self.pending_accepted[msg.proposal_id]['count'] += 1
-            self.pending_accepted[msg.proposal_id]['received'].add(msg.sender)
-            self.recv_accepted(msg.sender, msg.proposal_id, msg.accepted_value)
-            
-            # Check if we have enough accepted messages
-            if self.pending_accepted[msg.proposal_id]['count'] >= self.quorum_size:
-                self.on_resolution(msg.proposal_id, msg.accepted_value)
-                del self.pending_accepted[msg.proposal_id]
+        try:
+            if msg.msg_type == 'accepted':
+                if msg.proposal_id not in self.pending_accepted:
+                    self.pending_accepted[msg.proposal_id] = {
+                        'value': msg.accepted_value,
+                        'received_mask': 0
+                    }
+                
+                # One bit per acceptor, so a resent accepted from the same acceptor is not counted twice
+                pending = self.pending_accepted[msg.proposal_id]
+                pending['received_mask'] |= self.network.acceptor_bits[msg.sender]
+                self.recv_accepted(msg.sender, msg.proposal_id, msg.accepted_value)
+                
+                # Check if we have enough distinct acceptors
+                if pending['received_mask'].bit_count() >= self.quorum_size:
+                    self.on_resolution(msg.proposal_id, msg.accepted_value)
+                    del self.pending_accepted[msg.proposal_id]
+        finally:
+            # Handled synchronously, so the message can be recycled right away
+            NetworkMessage.release(msg)
 
 def simulate_paxos(num_proposers: int = 2, 
                   num_acceptors: int = 2,
                   num_learners: int = 2,
                   delay_range: Tuple[float, float] = (0.0, 0.0),
-                  failure_rate: float = 0.0):
+                  failure_rate: float = 0.0,
+                  rng=None,
+                  counts: bool = False):
     # Create network with no delay and no failures
-    network = NetworkSimulator(delay_range, failure_rate)
+    network = NetworkSimulator(delay_range, failure_rate, rng=rng)
     
     # Create nodes
     proposers = [PaxosProposer(f'P{i}', network, num_acceptors // 2 + 1) 
@@ -544,19 +867,14 @@ def simulate_paxos(num_proposers: int = 2,
     
     # Let first proposer propose a value
     proposers[0].set_proposal("Initial Value")
-    proposers[0].start_time = time.time()  # Set start time before prepare
+    proposers[0].start_time = network.now()  # Set start time before prepare
     proposers[0].prepare()
     
     # Wait until consensus or timeout
-    start_time = time.time()
     timeout_limit = 30.0  # Increased timeout to 30 seconds
-    while proposers[0].consensus_time is None and (time.time() - start_time) < timeout_limit:
-        time.sleep(0.1)  # Increased sleep time to 0.1 seconds
-        if proposers[0].current_phase == 'accept':
-            logger.info(f"Proposer {proposers[0].node_id} in accept phase")
-        if proposers[0].consensus_time is not None:
-            consensus_duration = proposers[0].consensus_time - proposers[0].start_time
-            logger.info(f"Consensus reached in {consensus_duration:.6f} seconds")
+    if proposers[0].consensus_event.wait(timeout=timeout_limit):
+        consensus_duration = proposers[0].consensus_time - proposers[0].start_time
+        logger.info(f"Consensus reached in {consensus_duration:.6f} seconds")
 
     consensus_before = proposers[0].consensus_time is not None
     consensus_time = proposers[0].consensus_time - proposers[0].start_time if proposers[0].consensus_time is not None else None
@@ -566,4 +884,7 @@ def simulate_paxos(num_proposers: int = 2,
     network.stop()
     logger.info("Simulation complete")
 
-    return timeout_limit, consensus_before, consensus_time, rounds, network.total_retries
\ No newline at end of file
+    result = (timeout_limit, consensus_before, consensus_time, rounds, network.total_retries)
+    if counts:  # also report how many messages were sent and dropped
+        return result + (network.message_count, network.dropped_messages)
+    return result
\ No newline at end of file
@@ -6,9 +6,13 @@ import random
 import queue
 from typing import Dict, List, Tuple, Optional
 import logging
+import numpy as np
 from paxos_main.essential import Proposer, Acceptor, Learner, ProposalID
 from paxos_simulation import NetworkMessage, NetworkSimulator, PaxosNode, PaxosProposer, PaxosAcceptor, PaxosLearner
 
+# Fraction of the path covered by each of the 10 animation frames
+ANIMATION_STEPS = np.linspace(0.1, 1.0, 10, dtype=np.float32)[:, None]
+
 class PaxosVisualizer:
     def __init__(self, root):
         self.root = root
@@ -35,13 +39,21 @@ class PaxosVisualizer:
         self.log_area = scrolledtext.ScrolledText(self.log_frame, width=100, height=10)
         self.log_area.pack()
         
+        # Log lines are buffered and flushed to the widget every 100 ms
+        self._log_buffer: List[str] = []
+        self._log_lock = threading.Lock()
+        self.root.after(100, self._flush_logs)
+        
         # Initialize simulation
         self.simulation = None
         self.running = False
         
-        # Node positions
-        self.node_positions = {}
-        self.message_lines = []
+        # Node positions: dense index per node id into an (N, 2) array
+        self.node_index = {}
+        self.node_positions = np.empty((0, 2), dtype=np.float32)
+        # In-flight arrows as [line_id, frames, step], advanced together by _tick_arrows
+        self._arrows = []
+        self._ticking = False
         
     def create_control_panel(self):
         # Node configuration
@@ -88,14 +100,16 @@ class PaxosVisualizer:
         
     def draw_network(self, proposers, acceptors, learners):
         self.canvas.delete("all")
-        self.node_positions.clear()
-        self.message_lines.clear()
+        self.node_index.clear()
+        self._arrows.clear()
+        positions = []
         
         # Draw proposers
         for i, proposer in enumerate(proposers):
             x = 100
             y = 100 + i * 80
-            self.node_positions[proposer.node_id] = (x, y)
+            self.node_index[proposer.node_id] = len(positions)
+            positions.append((x, y))
             self.canvas.create_oval(x-20, y-20, x+20, y+20, fill='blue')
             self.canvas.create_text(x, y, text=f"P{i}")
             
@@ -103,7 +117,8 @@ class PaxosVisualizer:
         for i, acceptor in enumerate(acceptors):
             x = 400
             y = 100 + i * 80
-            self.node_positions[acceptor.node_id] = (x, y)
+            self.node_index[acceptor.node_id] = len(positions)
+            positions.append((x, y))
             self.canvas.create_oval(x-20, y-20, x+20, y+20, fill='green')
             self.canvas.create_text(x, y, text=f"A{i}")
             
@@ -111,44 +126,64 @@ class PaxosVisualizer:
         for i, learner in enumerate(learners):
             x = 700
             y = 100 + i * 80
-            self.node_positions[learner.node_id] = (x, y)
+            self.node_index[learner.node_id] = len(positions)
+            positions.append((x, y))
             self.canvas.create_oval(x-20, y-20, x+20, y+20, fill='red')
             self.canvas.create_text(x, y, text=f"L{i}")
+
+        self.node_positions = np.array(positions, dtype=np.float32).reshape(-1, 2)
             
     def draw_message(self, msg: NetworkMessage):
-        if msg.sender not in self.node_positions or msg.receiver not in self.node_positions:
+        if msg.sender not in self.node_index or msg.receiver not in self.node_index:
             return
             
-        start_pos = self.node_positions[msg.sender]
-        end_pos = self.node_positions[msg.receiver]
+        start_pos = self.node_positions[self.node_index[msg.sender]]
+        end_pos = self.node_positions[self.node_index[msg.receiver]]
+        # All animation frames in one vectorized interpolation, stored as
+        # ready-to-use (x1, y1, x, y) coords tuples
+        points = start_pos + ANIMATION_STEPS * (end_pos - start_pos)
+        x1, y1 = start_pos.tolist()
+        frames = [(x1, y1, x, y) for x, y in points.tolist()]
         
         # Create animated line
-        line = self.canvas.create_line(start_pos[0], start_pos[1], 
-                                     start_pos[0], start_pos[1],
-                                     arrow=tk.LAST, fill='black')
-        self.message_lines.append(line)
-        
-        # Animate the line
-        def animate_line():
-            for i in range(10):
-                x1, y1 = start_pos
-                x2, y2 = end_pos
-                progress = (i + 1) / 10
-                current_x = x1 + (x2 - x1) * progress
-                current_y = y1 + (y2 - y1) * progress
-                self.canvas.coords(line, x1, y1, current_x, current_y)
-                self.root.update()
-                time.sleep(0.05)
-            
-            # Remove the line after animation
-            self.canvas.after(1000, lambda: self.canvas.delete(line))
-            self.message_lines.remove(line)
-            
-        threading.Thread(target=animate_line, daemon=True).start()
+        line = self.canvas.create_line(x1, y1, x1, y1, arrow=tk.LAST, fill='black')
+        self._arrows.append([line, frames, 0])
+        if not self._ticking:
+            self._ticking = True
+            self.root.after(50, self._tick_arrows)
+
+    def _tick_arrows(self):
+        # Advance every in-flight arrow by one frame in a single Tk callback
+        coords = self.canvas.coords
+        remaining = []
+        for arrow in self._arrows:
+            line, frames, step = arrow
+            coords(line, *frames[step])
+            if step + 1 < len(frames):
+                arrow[2] = step + 1
+                remaining.append(arrow)
+            else:
+                # Remove the line after animation
+                self.canvas.after(1000, self.canvas.delete, line)
+        self._arrows = remaining
+
+        if remaining:
+            self.root.after(50, self._tick_arrows)
+        else:
+            self._ticking = False
         
     def log_message(self, msg: str):
-        self.log_area.insert(tk.END, f"{time.strftime('%H:%M:%S')} - {msg}\n")
-        self.log_area.see(tk.END)
+        with self._log_lock:
+            self._log_buffer.append(f"{time.strftime('%H:%M:%S')} - {msg}\n")
+
+    def _flush_logs(self):
+        with self._log_lock:
+            chunk = ''.join(self._log_buffer)
+            self._log_buffer.clear()
+        if chunk:
+            self.log_area.insert(tk.END, chunk)
+            self.log_area.see(tk.END)
+        self.root.after(100, self._flush_logs)
         
     def start_simulation(self):
         if self.running:
@@ -156,6 +191,8 @@ class PaxosVisualizer:
             
         self.running = True
         self.log_area.delete(1.0, tk.END)
+        with self._log_lock:
+            self._log_buffer.clear()
         
         # Get parameters from controls
         num_proposers = int(self.proposer_count.get())
@@ -1,108 +1,128 @@
 import sys
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                           QHBoxLayout, QLabel, QSpinBox, QPushButton, QTextEdit, QLineEdit)
-from PyQt6.QtCore import Qt, QTimer, QPoint, QThread, pyqtSignal
-from PyQt6.QtGui import QPainter, QColor, QPen
+                           QHBoxLayout, QLabel, QSpinBox, QPushButton, QPlainTextEdit, QLineEdit)
+from PyQt6.QtCore import Qt, QTimer, QPointF, QLineF, QRectF, QObject, pyqtSignal
+from PyQt6.QtGui import QPainter, QColor, QPen, QBrush, QFont, QPixmap, QPolygonF, QSurfaceFormat
+try:
+    # Paint the canvas through the OpenGL engine when the QtOpenGL module is available
+    from PyQt6.QtOpenGLWidgets import QOpenGLWidget as CanvasBase
+    USE_OPENGL = True
+except ImportError:
+    CanvasBase = QWidget
+    USE_OPENGL = False
 import threading
 import time
 import random
 import queue
+from collections import deque
 from typing import Dict, List, Tuple, Optional
 from paxos_main.essential import Proposer, Acceptor, Learner, ProposalID
 from paxos_simulation import NetworkMessage, NetworkSimulator, PaxosNode, PaxosProposer, PaxosAcceptor, PaxosLearner
 import math
+import logging
 
-class SimulationThread(QThread):
-    message_signal = pyqtSignal(str)  # For logging messages
+logger = logging.getLogger(__name__)
+
+# How far drawing can spill outside a message's start/end box (labels, arrow
+# heads, drop explosion) and around a crashed node (explosion rings, label)
+MESSAGE_MARGIN = 80
+CRASH_EXTENT = 105
+
+# Node roles, parsed once from the id prefix in add_node
+ROLE_PROPOSER = 0
+ROLE_ACCEPTOR = 1
+ROLE_LEARNER = 2
+ROLE_PREFIXES = {'P': ROLE_PROPOSER, 'A': ROLE_ACCEPTOR, 'L': ROLE_LEARNER}
+
+# Legend box, drawn near the bottom left corner
+LEGEND_X = 20
+LEGEND_WIDTH = 250
+LEGEND_HEIGHT = 150
+
+# Arrow head parameters
+ARROW_SIZE = 10
+ARROW_ANGLE = math.pi / 6  # 30 degrees
+
+class SimulationController(QObject):
     simulation_complete = pyqtSignal()  # For signaling completion
+    network_empty = pyqtSignal()  # Last in-flight message was delivered or dropped
     
-    def __init__(self, simulation):
-        super().__init__()
+    PHASE_DELAY_MS = 2000  # Pause after a step that put nothing on the wire
+    
+    def __init__(self, simulation, parent=None):
+        super().__init__(parent)
         self.simulation = simulation
+        self._steps = simulation.run()
+        self._cancelled = False
+        self._waiting = False
+        # on_empty fires on whichever thread finished the last message
+        self.network_empty.connect(self._on_network_empty, Qt.ConnectionType.QueuedConnection)
+        simulation.network.on_empty = self.network_empty.emit
         
-    def run(self):
-        self.message_signal.emit("Starting Paxos simulation...")
-        
-        # Phase 1a: First proposer sends prepare
-        self.message_signal.emit("Phase 1a: P0 sending prepare messages")
-        self.simulation.proposers[0].set_proposal("Initial Value")
-        self.simulation.proposers[0].prepare()
-        time.sleep(2)  # Wait for messages to be processed
-        
-        # Phase 1b: Acceptors respond with promises
-        self.message_signal.emit("Phase 1b: Acceptors sending promise messages")
-        for acceptor in self.simulation.acceptors:
-            acceptor.recv_prepare("P0", self.simulation.proposers[0].proposal_id)
-        time.sleep(2)
-        
-        # Phase 2a: Proposer sends accept
-        self.message_signal.emit("Phase 2a: P0 sending accept messages")
-        self.simulation.proposers[0].send_accept(self.simulation.proposers[0].proposal_id, "Initial Value")
-        time.sleep(2)
-        
-        # Phase 2b: Acceptors accept and notify learners
-        self.message_signal.emit("Phase 2b: Acceptors accepting and notifying learners")
-        for acceptor in self.simulation.acceptors:
-            acceptor.recv_accept_request("P0", self.simulation.proposers[0].proposal_id, "Initial Value")
-        time.sleep(2)
+    def start(self):
+        self._next()
         
-        # Simulate leader crash
-        self.message_signal.emit("Simulating leader crash (P0)...")
-        self.simulation.proposers[0].running = False
-        time.sleep(2)
+    def cancel(self):
+        self._cancelled = True
+        self.simulation.network.on_empty = None
         
-        # Phase 1a: Second proposer sends prepare with higher number
-        if len(self.simulation.proposers) > 1:
-            self.message_signal.emit("Phase 1a: P1 sending prepare messages with higher number")
-            self.simulation.proposers[1].set_proposal("New Value After Crash")
-            self.simulation.proposers[1].prepare()
-            time.sleep(2)
-            
-            # Phase 1b: Acceptors respond with promises
-            self.message_signal.emit("Phase 1b: Acceptors sending promise messages to P1")
-            for acceptor in self.simulation.acceptors:
-                acceptor.recv_prepare("P1", self.simulation.proposers[1].proposal_id)
-            time.sleep(2)
-            
-            # Phase 2a: Send accept request
-            self.message_signal.emit("Phase 2a: P1 sending accept messages")
-            self.simulation.proposers[1].send_accept(self.simulation.proposers[1].proposal_id, 
-                                                   "New Value After Crash")
-            time.sleep(2)
-            
-            # Phase 2b: Acceptors accept and notify learners
-            self.message_signal.emit("Phase 2b: Acceptors accepting and notifying learners")
-            for acceptor in self.simulation.acceptors:
-                acceptor.recv_accept_request("P1", self.simulation.proposers[1].proposal_id, "New Value After Crash")
-            time.sleep(2)
+    def _next(self):
+        if self._cancelled:
+            return
+        try:
+            next(self._steps)
+        except StopIteration:
+            self.simulation_complete.emit()
+            return
+        if self.simulation.network.pending():
+            # Advance as soon as this phase's messages are delivered
+            self._waiting = True
+        else:
+            QTimer.singleShot(self.PHASE_DELAY_MS, self._next)
             
-            # Check if consensus was reached
-            for learner in self.simulation.learners:
-                if learner.final_value is not None:
-                    self.message_signal.emit(f"Consensus reached! Value: {learner.final_value}")
-        
-        # Let simulation run for a while to see all messages
-        time.sleep(2)
-        
-        # Stop simulation
-        self.simulation.stop()
-        self.message_signal.emit("Simulation complete")
-        self.simulation_complete.emit()
+    def _on_network_empty(self):
+        if self._waiting and not self.simulation.network.pending():
+            self._waiting = False
+            self._next()
 
-class NetworkCanvas(QWidget):
+class NetworkCanvas(CanvasBase):
+    # Emitted when something starts animating; queued onto the GUI thread
+    # because messages are added from network threads
+    animation_needed = pyqtSignal()
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.node_positions = {}
-        self.message_lines = []
-        self.crashed_nodes = set()
-        self.crash_animations = {}
+        self.node_meta = {}  # node_id -> (role, index within role)
+        # (start.x, start.y, end.x, end.y, msg_type, dropped) -> message record
+        self._messages = {}
+        self._pending = deque()  # messages handed over by network threads
+        self._crashed = {}  # node_id -> time the crash was marked
         self.visualizer = parent  # Store reference to parent visualizer
+        self._static_pixmap = QPixmap()
+        self._legend_pixmap = None
+        self._static_dirty = True
+        # Node ids per role, kept in add_node; layout only depends on their
+        # counts and the canvas size, and broadcasts draw to these lists
+        self._proposer_ids = []
+        self._acceptor_ids = []
+        self._learner_ids = []
+        self._layout_dirty = True
+        self._last_size = None
         self.setMinimumSize(800, 600)
-        
-        # Create timer for message animation
+        if USE_OPENGL:
+            # Multisampling keeps the antialiased look on the GL paint engine
+            fmt = QSurfaceFormat()
+            fmt.setSamples(4)
+            self.setFormat(fmt)
+        # paintEvent blits an opaque background layer, so Qt can skip erasing it
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        
+        # Create timer for message animation; it only runs while something animates
         self.animation_timer = QTimer(self)
-        self.animation_timer.timeout.connect(self.update)
-        self.animation_timer.start(16)  # 60 FPS
+        self.animation_timer.setInterval(16)  # 60 FPS
+        self.animation_timer.timeout.connect(self.compute_and_update)
+        self.animation_needed.connect(self._ensure_fast_timer)
         
         # Define message colors and descriptions
         self.message_types = {
@@ -111,222 +131,275 @@ class NetworkCanvas(QWidget):
             'accept': (QColor(255, 0, 255), "Accept: Proposal with value"),
             'accepted': (QColor(0, 255, 255), "Accepted: Value has been accepted")
         }
+        # Node colour and label per role
+        self._role_colors = (QColor(0, 0, 255),   # Blue for proposers
+                             QColor(0, 255, 0),   # Green for acceptors
+                             QColor(255, 0, 0))   # Red for learners
+        self._role_labels = ("Proposer", "Acceptor", "Learner")
+        
+        # Crashed-node pens and brushes
+        self._pen_outline = QPen(Qt.GlobalColor.black, 2)
+        self._pen_crashed_label = QPen(Qt.GlobalColor.red, 2)
+        
+        # 256-step lookup tables: pulse colours indexed by int(pulse * 255),
+        # fading red rings indexed by their alpha
+        self._pulse_gray_brushes = []
+        self._pulse_x_pens = []
+        for i in range(256):
+            gray = 128 + i * 64 // 255
+            fade = 128 * (255 - i) // 255
+            self._pulse_gray_brushes.append(QBrush(QColor(gray, gray, gray)))
+            self._pulse_x_pens.append(QPen(QColor(255, fade, fade), 3))
+        self._crash_ring_pens = [QPen(QColor(255, 0, 0, alpha), 3) for alpha in range(256)]
+        self._drop_ring_pens = [QPen(QColor(255, 0, 0, alpha), 2) for alpha in range(256)]
+        
+        # Fonts are built once; painter.setFont just switches between them
+        self._font_bold_12 = QFont(self.font())
+        self._font_bold_12.setPointSize(12)
+        self._font_bold_12.setBold(True)
+        self._font_bold_10 = QFont(self.font())
+        self._font_bold_10.setPointSize(10)
+        self._font_bold_10.setBold(True)
+        self._font_bold_9 = QFont(self.font())
+        self._font_bold_9.setPointSize(9)
+        self._font_bold_9.setBold(True)
+        self._font_plain = QFont(self.font())
+        self._font_plain.setPointSize(9)
+        
+        # Reused for every arrow head; its points are overwritten per draw
+        self._arrow_polygon = QPolygonF([QPointF(), QPointF(), QPointF()])
+        
+        # One pen per (msg_type, dropped), shared by every message of that kind
+        self._message_pens = {}
+        for msg_type, (color, _) in self.message_types.items():
+            self._message_pens[msg_type, False] = QPen(color, 3)
+            self._message_pens[msg_type, True] = QPen(QColor(255, 0, 0), 3, Qt.PenStyle.DashLine)
+        
+    def compute_and_update(self):
+        """Repaint only the area covered by in-flight messages and crashed nodes"""
+        self._drain_pending()
+        if not self._messages and not self._crashed:
+            # Idle: stop waking up until the next message or crash
+            self.animation_timer.stop()
+            return
+        dirty = QRectF()
+        for msg in self._messages.values():
+            dirty = dirty.united(msg[6])
+        for node_id in self._crashed:
+            pos = self.node_positions.get(node_id)
+            if pos is not None:
+                dirty = dirty.united(QRectF(pos.x() - CRASH_EXTENT, pos.y() - CRASH_EXTENT,
+                                            2 * CRASH_EXTENT, 2 * CRASH_EXTENT))
+        self.update(dirty.toAlignedRect())
+        
+    def initializeGL(self):
+        # Everything is drawn with QPainter; no GL state to set up
+        pass
+        
+    def _ensure_fast_timer(self):
+        if not self.animation_timer.isActive():
+            self.animation_timer.start()
         
     def paintEvent(self, event):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         
-        # Calculate node positions based on canvas size
-        self.update_node_positions()
-        
-        # Draw legend
-        self.draw_legend(painter)
-        
-        # Draw nodes
-        for node_id, pos in self.node_positions.items():
-            if node_id.startswith('P'):
-                color = QColor(0, 0, 255)  # Blue for proposers
-                role = "Proposer"
-            elif node_id.startswith('A'):
-                color = QColor(0, 255, 0)  # Green for acceptors
-                role = "Acceptor"
-            else:
-                color = QColor(255, 0, 0)  # Red for learners
-                role = "Learner"
-                
-            # Draw node circle
-            if node_id in self.crashed_nodes:
-                # Animate crash effect
-                crash_progress = self.crash_animations.get(node_id, 1.0)
-                
-                # Draw multiple explosion rings
-                if crash_progress < 1.0:
-                    for i in range(3):
-                        alpha = int(255 * (1 - crash_progress) * (1 - i/3))
-                        radius = int(25 + (50 * (1 - crash_progress) * (1 + i/2)))
-                        painter.setPen(QPen(QColor(255, 0, 0, alpha), 3))
-                        painter.drawEllipse(pos.x() - radius, pos.y() - radius,
-                                          radius * 2, radius * 2)
-                
-                # Draw crashed node with pulsing effect
-                pulse = (math.sin(time.time() * 5) + 1) / 2  # 5Hz pulse
-                gray_value = int(128 + 64 * pulse)
-                painter.setBrush(QColor(gray_value, gray_value, gray_value))
-                painter.setPen(QPen(Qt.GlobalColor.black, 2))
-                painter.drawEllipse(pos.x() - 25, pos.y() - 25, 50, 50)
-                
-                # Draw pulsing X
-                x_color = QColor(255, int(128 * (1 - pulse)), int(128 * (1 - pulse)))
-                painter.setPen(QPen(x_color, 3))
-                painter.drawLine(pos.x() - 15, pos.y() - 15, pos.x() + 15, pos.y() + 15)
-                painter.drawLine(pos.x() - 15, pos.y() + 15, pos.x() + 15, pos.y() - 15)
-                
-                # Draw "CRASHED" label
-                font = painter.font()
-                font.setBold(True)
-                font.setPointSize(12)
-                painter.setFont(font)
-                painter.setPen(QPen(Qt.GlobalColor.red, 2))
-                painter.drawText(QPoint(pos.x() - 30, pos.y() - 40), "CRASHED")
-            else:
-                painter.setBrush(color)
-                painter.setPen(QPen(Qt.GlobalColor.black, 2))
-                painter.drawEllipse(pos.x() - 25, pos.y() - 25, 50, 50)
+        # One clock read and one pulse value shared by everything in this frame
+        now = time.time()
+        pulse = (math.sin(now * 5) + 1) / 2  # 5Hz pulse
+        pulse_idx = int(pulse * 255)
+        
+        # Calculate node positions when the node set or canvas size changed
+        if self._layout_dirty or self._last_size != self.size():
+            self.update_node_positions()
+        
+        # Legend and healthy nodes only change on resize / crash toggle,
+        # so they come from a cached layer
+        if self._static_dirty or self._static_pixmap.size() != self.size():
+            self._rebuild_static_pixmap()
+        # A GL framebuffer is redrawn in full, so partial blits only apply to QWidget
+        dirty = self.rect() if USE_OPENGL else event.rect()
+        painter.drawPixmap(dirty, self._static_pixmap, dirty)
+        
+        # Draw crashed nodes
+        for node_id, crash_start in self._crashed.items():
+            pos = self.node_positions.get(node_id)
+            if pos is None:
+                continue
+            # Animate crash effect over 2 seconds
+            crash_progress = min((now - crash_start) / 2.0, 1.0)
+            
+            # Draw multiple explosion rings
+            if crash_progress < 1.0:
+                for i in range(3):
+                    alpha = int(255 * (1 - crash_progress) * (1 - i/3))
+                    radius = int(25 + (50 * (1 - crash_progress) * (1 + i/2)))
+                    painter.setPen(self._crash_ring_pens[alpha])
+                    painter.drawEllipse(pos, radius, radius)
+            
+            # Draw crashed node with pulsing effect
+            painter.setBrush(self._pulse_gray_brushes[pulse_idx])
+            painter.setPen(self._pen_outline)
+            painter.drawEllipse(pos, 25, 25)
+            
+            # Draw pulsing X
+            painter.setPen(self._pulse_x_pens[pulse_idx])
+            painter.drawLine(QLineF(pos.x() - 15, pos.y() - 15, pos.x() + 15, pos.y() + 15))
+            painter.drawLine(QLineF(pos.x() - 15, pos.y() + 15, pos.x() + 15, pos.y() - 15))
             
-            # Draw node ID and role
-            painter.setPen(Qt.GlobalColor.black)
-            font = painter.font()
-            font.setBold(True)
-            painter.setFont(font)
-            painter.drawText(QPoint(pos.x() - 15, pos.y() + 5), node_id)
-            font.setBold(False)
-            painter.setFont(font)
-            painter.drawText(QPoint(pos.x() - 25, pos.y() + 40), role)
+            # Draw "CRASHED" label
+            painter.setFont(self._font_bold_12)
+            painter.setPen(self._pen_crashed_label)
+            painter.drawText(QPointF(pos.x() - 30, pos.y() - 40), "CRASHED")
+            
+            self.draw_node_labels(painter, node_id, pos)
             
         # Draw message lines with enhanced visualization for dropped messages
-        current_time = time.time()
-        remaining_lines = []
-        for msg in self.message_lines:
-            start_pos, end_pos, msg_type, start_time, duration, dropped, msg_id = msg
-            elapsed = current_time - start_time
-            if elapsed < duration:
-                progress = elapsed / duration
-                current_x = start_pos.x() + (end_pos.x() - start_pos.x()) * progress
-                current_y = start_pos.y() + (end_pos.y() - start_pos.y()) * progress
-                current_pos = QPoint(int(current_x), int(current_y))
+        expired = []
+        live = []
+        # Lines sharing a pen are drawn with one setPen/drawLines call
+        line_batches = {}
+        # Only the GUI thread touches _messages, so no snapshot is needed
+        for key, msg in self._messages.items():
+            start_pos, start_time, duration, dx = msg[0], msg[3], msg[4], msg[7]
+            elapsed = now - start_time
+            if elapsed >= duration:
+                expired.append(key)
+                continue
+            progress = elapsed / duration
+            current_x = start_pos.x() + dx * progress
+            current_y = start_pos.y() + msg[8] * progress
+            current_pos = QPointF(current_x, current_y)
+            line_batches.setdefault(key[4:], []).append(QLineF(start_pos, current_pos))
+            live.append((msg, progress, current_x, current_y, current_pos))
+        
+        for batch_key, lines in line_batches.items():
+            painter.setPen(self._message_pens[batch_key])
+            painter.drawLines(lines)
+        
+        for msg, progress, current_x, current_y, current_pos in live:
+            start_pos, dropped, color, head, label = msg[0], msg[5], msg[9], msg[10], msg[11]
+            if dropped:
+                # Draw "DROPPED" text
+                mid_x = (start_pos.x() + current_x) / 2
+                mid_y = (start_pos.y() + current_y) / 2 - 15
+                painter.setFont(self._font_bold_10)
                 
-                color = self.message_types[msg_type][0]
+                # Draw text without shadow
+                painter.setPen(QPen(Qt.GlobalColor.red, 2))
+                painter.drawText(QPointF(mid_x - 30, mid_y), label)
                 
-                if dropped:
-                    # Draw dropped message visualization
-                    pen = QPen(QColor(255, 0, 0), 3, Qt.PenStyle.DashLine)
-                    painter.setPen(pen)
-                    painter.drawLine(start_pos, current_pos)
-                    
-                    # Draw "DROPPED" text
-                    mid_x = (start_pos.x() + current_x) / 2
-                    mid_y = (start_pos.y() + current_y) / 2 - 15
-                    font = painter.font()
-                    font.setBold(True)
-                    font.setPointSize(10)
-                    painter.setFont(font)
-                    
-                    # Draw text without shadow
-                    painter.setPen(QPen(Qt.GlobalColor.red, 2))
-                    painter.drawText(QPoint(int(mid_x) - 30, int(mid_y)), "DROPPED")
-                    
-                    # Draw explosion effect at the drop point
-                    explosion_radius = int(10 + (20 * (1 - progress)))
-                    painter.setPen(QPen(QColor(255, 0, 0, int(255 * (1 - progress))), 2))
-                    painter.drawEllipse(int(current_x) - explosion_radius, int(current_y) - explosion_radius,
-                                      explosion_radius * 2, explosion_radius * 2)
-                else:
-                    pen = QPen(color, 3)
-                    painter.setPen(pen)
-                    painter.drawLine(start_pos, current_pos)
-                    
-                    if progress > 0.1:
-                        self.draw_arrow_head(painter, current_pos, start_pos, end_pos, color)
-                    
-                    # Draw message type label
-                    mid_x = (start_pos.x() + current_x) / 2
-                    mid_y = (start_pos.y() + current_y) / 2 - 15
-                    painter.setPen(Qt.GlobalColor.black)
-                    font = painter.font()
-                    font.setBold(True)
-                    painter.setFont(font)
-                    painter.drawText(QPoint(int(mid_x), int(mid_y)), msg_type.upper())
+                # Draw explosion effect at the drop point
+                explosion_radius = int(10 + (20 * (1 - progress)))
+                painter.setPen(self._drop_ring_pens[int(255 * (1 - progress))])
+                painter.drawEllipse(current_pos, explosion_radius, explosion_radius)
+            else:
+                if progress > 0.1:
+                    self.draw_arrow_head(painter, current_pos, head, color)
                 
-                remaining_lines.append(msg)
+                # Draw message type label
+                mid_x = (start_pos.x() + current_x) / 2
+                mid_y = (start_pos.y() + current_y) / 2 - 15
+                painter.setPen(Qt.GlobalColor.black)
+                painter.setFont(self._font_bold_9)
+                painter.drawText(QPointF(mid_x, mid_y), label)
 
-        self.message_lines = remaining_lines
+        for key in expired:
+            self._messages.pop(key, None)
+    
+    def _rebuild_static_pixmap(self):
+        """Pre-render the legend and all non-crashed nodes"""
+        self._static_pixmap = QPixmap(self.size())
+        self._static_pixmap.fill(self.palette().window().color())
+        painter = QPainter(self._static_pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
         
-        # Update crash animations
-        current_time = time.time()
-        for node_id in list(self.crash_animations.keys()):
-            if current_time - self.crash_animations[node_id] > 2.0:  # 2 second animation
-                del self.crash_animations[node_id]
-            else:
-                self.crash_animations[node_id] = current_time - self.crash_animations[node_id]
+        # Draw legend; its content never changes, so it is rendered only once
+        if self._legend_pixmap is None:
+            self._legend_pixmap = self._build_legend_pixmap()
+        painter.drawPixmap(LEGEND_X - 1, self.height() - 161, self._legend_pixmap)
+        
+        # Draw nodes
+        for node_id, pos in self.node_positions.items():
+            if node_id in self._crashed:
+                continue
+            painter.setBrush(self._role_colors[self.node_meta[node_id][0]])
+            painter.setPen(QPen(Qt.GlobalColor.black, 2))
+            painter.drawEllipse(pos, 25, 25)
+            self.draw_node_labels(painter, node_id, pos)
+        
+        painter.end()
+        self._static_dirty = False
+    
+    def draw_node_labels(self, painter, node_id, pos):
+        role = self._role_labels[self.node_meta[node_id][0]]
+        # Draw node ID and role
+        painter.setPen(Qt.GlobalColor.black)
+        painter.setFont(self._font_bold_9)
+        painter.drawText(QPointF(pos.x() - 15, pos.y() + 5), node_id)
+        painter.setFont(self._font_plain)
+        painter.drawText(QPointF(pos.x() - 25, pos.y() + 40), role)
+    
+    def resizeEvent(self, event):
+        self._layout_dirty = True
+        self._static_dirty = True
+        super().resizeEvent(event)
     
     def update_node_positions(self):
         width = self.width()
         height = self.height()
         margin = 100  # Margin from edges
         
-        # Count nodes of each type
-        num_proposers = len([n for n in self.node_positions.keys() if n.startswith('P')])
-        num_acceptors = len([n for n in self.node_positions.keys() if n.startswith('A')])
-        num_learners = len([n for n in self.node_positions.keys() if n.startswith('L')])
-        
         # Calculate vertical spacing
-        max_nodes = max(num_proposers, num_acceptors, num_learners)
+        max_nodes = max(len(self._proposer_ids), len(self._acceptor_ids), len(self._learner_ids))
         v_spacing = (height - 2 * margin) // (max_nodes - 1) if max_nodes > 1 else height // 2
         
-        # Update positions
-        for node_id in self.node_positions.keys():
-            if node_id.startswith('P'):
-                idx = int(node_id[1])
-                x = int(margin)
-                y = int(margin + (v_spacing * idx))
-            elif node_id.startswith('A'):
-                idx = int(node_id[1])
-                x = int(width // 2)
-                y = int(margin + (v_spacing * idx))
-            else:  # Learners
-                idx = int(node_id[1])
-                x = int(width - margin)
-                y = int(margin + (v_spacing * idx))
-            
-            self.node_positions[node_id] = QPoint(x, y)
+        # Update positions; proposers left, acceptors centre, learners right
+        columns = (margin, width // 2, width - margin)
+        for node_id, (role, idx) in self.node_meta.items():
+            self.node_positions[node_id] = QPointF(columns[role], margin + v_spacing * idx)
+        
+        self._layout_dirty = False
+        self._last_size = self.size()
+        self._static_dirty = True
     
-    def draw_arrow_head(self, painter, tip, start, end, color):
-        # Calculate arrow direction
-        dx = end.x() - start.x()
-        dy = end.y() - start.y()
-        angle = math.atan2(dy, dx)
-        
-        # Arrow head parameters
-        arrow_size = 10
-        arrow_angle = math.pi / 6  # 30 degrees
-        
-        # Calculate arrow head points
-        p1 = QPoint(
-            int(tip.x() - arrow_size * math.cos(angle - arrow_angle)),
-            int(tip.y() - arrow_size * math.sin(angle - arrow_angle))
-        )
-        p2 = QPoint(
-            int(tip.x() - arrow_size * math.cos(angle + arrow_angle)),
-            int(tip.y() - arrow_size * math.sin(angle + arrow_angle))
-        )
+    def draw_arrow_head(self, painter, tip, head, color):
+        # head holds the barb offsets precomputed in add_message
+        hx1, hy1, hx2, hy2 = head
+        polygon = self._arrow_polygon
+        polygon[0] = tip
+        polygon[1] = QPointF(tip.x() - hx1, tip.y() - hy1)
+        polygon[2] = QPointF(tip.x() - hx2, tip.y() - hy2)
         
         # Draw arrow head
         painter.setBrush(color)
-        points = [tip, p1, p2]
-        painter.drawPolygon(points)
+        painter.drawPolygon(polygon)
+    
+    def _build_legend_pixmap(self):
+        # One pixel of padding on each side for the 2px border
+        pixmap = QPixmap(LEGEND_WIDTH + 2, LEGEND_HEIGHT + 2)
+        pixmap.fill(Qt.GlobalColor.transparent)
+        painter = QPainter(pixmap)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        self.draw_legend(painter, 1, 1)
+        painter.end()
+        return pixmap
     
-    def draw_legend(self, painter):
+    def draw_legend(self, painter, legend_x, legend_y):
         # Draw legend box
-        legend_x = 20
-        legend_y = self.height() - 160  # Move it near the bottom!
-        legend_width = 250  # Increased width
-        legend_height = 150  # Increased height
+        legend_width = LEGEND_WIDTH
+        legend_height = LEGEND_HEIGHT
         
         painter.setBrush(QColor(255, 255, 255, 230))  # More opaque background
         painter.setPen(QPen(Qt.GlobalColor.black, 2))  # Thicker border
         painter.drawRect(legend_x, legend_y, legend_width, legend_height)
         
         # Draw legend title
-        font = painter.font()
-        font.setBold(True)
-        font.setPointSize(10)  # Increased font size
-        painter.setFont(font)
+        painter.setFont(self._font_bold_10)
         painter.drawText(legend_x + 10, legend_y + 25, "Message Types:")
         
         # Draw legend items
-        font.setBold(False)
-        font.setPointSize(9)  # Slightly smaller for items
-        painter.setFont(font)
+        painter.setFont(self._font_plain)  # Slightly smaller for items
         y_offset = 45
         for msg_type, (color, description) in self.message_types.items():
             # Draw color box
@@ -338,26 +411,59 @@ class NetworkCanvas(QWidget):
             painter.drawText(legend_x + 35, legend_y + y_offset + 15, description)
             y_offset += 25  # Increased spacing between items
     
-    def add_node(self, node_id: str, pos: QPoint):
+    def add_node(self, node_id: str, pos: QPointF):
+        if node_id not in self.node_meta:
+            role = ROLE_PREFIXES.get(node_id[0], ROLE_LEARNER)
+            self.node_meta[node_id] = (role, int(node_id[1:]))
+            (self._proposer_ids, self._acceptor_ids, self._learner_ids)[role].append(node_id)
         self.node_positions[node_id] = pos
+        self._layout_dirty = True
+        self._static_dirty = True
         self.update()
+        
+    def clear_nodes(self):
+        self.node_positions.clear()
+        self.node_meta.clear()
+        self._proposer_ids.clear()
+        self._acceptor_ids.clear()
+        self._learner_ids.clear()
+        self._layout_dirty = True
+        self._static_dirty = True
 
-    def add_message(self, start: QPoint, end: QPoint, msg_type: str, dropped=False):
+    def add_message(self, start: QPointF, end: QPointF, msg_type: str, dropped=False):
         """Add a message to the visualization"""
+        # Network threads call this; the GUI thread picks it up on the next tick
+        self._pending.append((start, end, msg_type, dropped, time.time()))
+        self.animation_needed.emit()
+        
+    def _drain_pending(self):
+        while self._pending:
+            self._insert_message(*self._pending.popleft())
+            
+    def _insert_message(self, start, end, msg_type, dropped, sent_at):
         duration = 2.0
-        # If this is a dropped message, remove any existing solid message for the same tuple
+        key = (start.x(), start.y(), end.x(), end.y(), msg_type, dropped)
+        counterpart = key[:5] + (not dropped,)
         if dropped:
-            self.message_lines = [m for m in self.message_lines
-                                  if not (m[0] == start and m[1] == end and m[2] == msg_type and not m[5])]
-        else:
+            # A dropped message replaces any solid message for the same tuple
+            self._messages.pop(counterpart, None)
+        elif counterpart in self._messages:
             # If a dropped version exists, skip adding the solid message
-            for m in self.message_lines:
-                if m[0] == start and m[1] == end and m[2] == msg_type and m[5]:
-                    return
+            return
         # Only add the message if it's not already being animated
-        msg_id = f"{start.x()}-{start.y()}-{end.x()}-{end.y()}-{msg_type}-{dropped}"
-        if not any(m[6] == msg_id for m in self.message_lines):
-            self.message_lines.append((start, end, msg_type, time.time(), duration, dropped, msg_id))
+        if key not in self._messages:
+            bbox = QRectF(start, end).normalized().adjusted(-MESSAGE_MARGIN, -MESSAGE_MARGIN,
+                                                            MESSAGE_MARGIN, MESSAGE_MARGIN)
+            # Direction and arrow head never change while a message is in flight
+            dx = end.x() - start.x()
+            dy = end.y() - start.y()
+            angle = math.atan2(dy, dx)
+            head = (ARROW_SIZE * math.cos(angle - ARROW_ANGLE), ARROW_SIZE * math.sin(angle - ARROW_ANGLE),
+                    ARROW_SIZE * math.cos(angle + ARROW_ANGLE), ARROW_SIZE * math.sin(angle + ARROW_ANGLE))
+            color = self.message_types[msg_type][0]
+            label = "DROPPED" if dropped else msg_type.upper()
+            self._messages[key] = (start, end, msg_type, sent_at, duration, dropped, bbox,
+                                   dx, dy, color, head, label)
             if self.visualizer:
                 if dropped:
                     self.visualizer.log_message(f"Message dropped: {msg_type}")
@@ -366,16 +472,18 @@ class NetworkCanvas(QWidget):
         
     def mark_node_crashed(self, node_id: str):
         """Mark a node as crashed in the visualization with animation"""
-        print(f"DEBUG: Marking node {node_id} as crashed")  # Debug log
-        self.crashed_nodes.add(node_id)
-        self.crash_animations[node_id] = time.time()
+        logger.debug("Marking node %s as crashed", node_id)
+        self._crashed[node_id] = time.time()
+        self._static_dirty = True
         self.update()
-        print(f"DEBUG: Node {node_id} marked as crashed, crashed_nodes: {self.crashed_nodes}")  # Debug log
+        self.animation_needed.emit()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Node %s marked as crashed, crashed_nodes: %s", node_id, set(self._crashed))
 
     def reset_crashed_nodes(self):
         """Reset all crashed nodes"""
-        self.crashed_nodes.clear()
-        self.crash_animations.clear()
+        self._crashed.clear()
+        self._static_dirty = True
         self.update()
 
 class PaxosVisualizer(QMainWindow):
@@ -483,10 +591,18 @@ class PaxosVisualizer(QMainWindow):
         right_layout.addWidget(self.stop_button)
         
         # Create log area
-        self.log_area = QTextEdit()
+        self.log_area = QPlainTextEdit()
         self.log_area.setReadOnly(True)
+        self.log_area.setMaximumBlockCount(1000)
         right_layout.addWidget(self.log_area)
         
+        # Log lines are buffered and appended in one go at most 20 times a second
+        self._log_buf: List[str] = []
+        self._log_lock = threading.Lock()
+        self._log_timer = QTimer(self)
+        self._log_timer.timeout.connect(self._flush_logs)
+        self._log_timer.start(50)
+        
         # Initialize simulation
         self.simulation = None
         self.running = False
@@ -499,6 +615,8 @@ class PaxosVisualizer(QMainWindow):
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
         self.log_area.clear()
+        with self._log_lock:
+            self._log_buf.clear()
         
         # Get parameters from controls
         num_proposers = self.proposer_count.value()
@@ -512,11 +630,10 @@ class PaxosVisualizer(QMainWindow):
                                         delay_range, failure_rate)
                                         
         self.canvas.update_node_positions()   # <-- Force update before anything starts
-        # Create and start simulation thread
-        self.sim_thread = SimulationThread(self.simulation)
-        self.sim_thread.message_signal.connect(self.log_message)
-        self.sim_thread.simulation_complete.connect(self.on_simulation_complete)
-        self.sim_thread.start()
+        # Phases are driven by Qt timers on the GUI thread
+        self.sim_controller = SimulationController(self.simulation, self)
+        self.sim_controller.simulation_complete.connect(self.on_simulation_complete)
+        self.sim_controller.start()
         
     def on_simulation_complete(self):
         self.running = False
@@ -526,32 +643,46 @@ class PaxosVisualizer(QMainWindow):
     def stop_simulation(self):
         if self.simulation:
             self.simulation.stop()
-        if hasattr(self, 'sim_thread'):
-            self.sim_thread.terminate()
-            self.sim_thread.wait()
+        if hasattr(self, 'sim_controller'):
+            self.sim_controller.cancel()
         self.running = False
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         
     def log_message(self, msg: str):
-        self.log_area.append(f"{time.strftime('%H:%M:%S')} - {msg}")
+        with self._log_lock:
+            self._log_buf.append(f"{time.strftime('%H:%M:%S')} - {msg}")
+            
+    def log_messages(self, lines: List[str]):
+        """Queue several log lines under one lock and timestamp"""
+        stamp = time.strftime('%H:%M:%S')
+        with self._log_lock:
+            self._log_buf.extend(f"{stamp} - {line}" for line in lines)
+            
+    def _flush_logs(self):
+        with self._log_lock:
+            if not self._log_buf:
+                return
+            chunk = '\n'.join(self._log_buf)
+            self._log_buf.clear()
+        self.log_area.appendPlainText(chunk)
         
     def draw_network(self, proposers, acceptors, learners):
-        self.canvas.node_positions.clear()
+        self.canvas.clear_nodes()
         
         # Draw proposers
         for i, proposer in enumerate(proposers):
-            pos = QPoint(100, 100 + i * 80)
+            pos = QPointF(100, 100 + i * 80)
             self.canvas.add_node(proposer.node_id, pos)
             
         # Draw acceptors
         for i, acceptor in enumerate(acceptors):
-            pos = QPoint(400, 100 + i * 80)
+            pos = QPointF(400, 100 + i * 80)
             self.canvas.add_node(acceptor.node_id, pos)
             
         # Draw learners
         for i, learner in enumerate(learners):
-            pos = QPoint(700, 100 + i * 80)
+            pos = QPointF(700, 100 + i * 80)
             self.canvas.add_node(learner.node_id, pos)
             
     def draw_message(self, msg: NetworkMessage):
@@ -562,12 +693,10 @@ class PaxosVisualizer(QMainWindow):
         
         # Handle broadcast messages
         if msg.receiver == 'broadcast':
-            if msg.msg_type == 'prepare':
-                receivers = [node_id for node_id in self.canvas.node_positions if node_id.startswith('A')]
-            elif msg.msg_type == 'accept':
-                receivers = [node_id for node_id in self.canvas.node_positions if node_id.startswith('A')]
+            if msg.msg_type == 'prepare' or msg.msg_type == 'accept':
+                receivers = self.canvas._acceptor_ids
             elif msg.msg_type == 'accepted':
-                receivers = [node_id for node_id in self.canvas.node_positions if node_id.startswith('L')]
+                receivers = self.canvas._learner_ids
             else:
                 return
                 
@@ -612,102 +741,89 @@ class PaxosSimulation:
         self.visualizer.draw_network(self.proposers, self.acceptors, self.learners)
         
     def start(self):
-        # Start all nodes
+        # Start all nodes; phases are stepped by a SimulationController
         for node in self.proposers + self.acceptors + self.learners:
             node.start()
-            
-        # Start simulation thread
-        threading.Thread(target=self._run_simulation, daemon=True).start()
         
     def stop(self):
         self.running = False
         self.network.stop()
         self.visualizer.canvas.reset_crashed_nodes()
         
-    def _run_simulation(self):
-        self.visualizer.log_message("Starting Paxos simulation...")
-        
+    def run(self):
+        """Phase script; each yield waits for the network to drain"""
         # Phase 1a: First proposer sends prepare
-        self.visualizer.log_message("Phase 1a: P0 sending prepare messages")
+        self.visualizer.log_messages(["Starting Paxos simulation...",
+                                      "Phase 1a: P0 sending prepare messages"])
         self.proposers[0].set_proposal("Initial Value")
         self.proposers[0].prepare()
-        time.sleep(2)  # Wait for messages to be processed
+        yield
         
         # Phase 1b: Acceptors respond with promises
         self.visualizer.log_message("Phase 1b: Acceptors sending promise messages")
         for acceptor in self.acceptors:
             acceptor.recv_prepare("P0", self.proposers[0].proposal_id)
-        time.sleep(2)
+        yield
         
         # Phase 2a: Proposer sends accept
         self.visualizer.log_message("Phase 2a: P0 sending accept messages")
         self.proposers[0].send_accept(self.proposers[0].proposal_id, "Initial Value")
-        time.sleep(2)
+        yield
         
         # Phase 2b: Acceptors accept and notify learners
         self.visualizer.log_message("Phase 2b: Acceptors accepting and notifying learners")
         for acceptor in self.acceptors:
             acceptor.recv_accept_request("P0", self.proposers[0].proposal_id, "Initial Value")
-        time.sleep(2)
+        yield
         
         # Simulate leader crash with debug logging
         self.visualizer.log_message("Simulating leader crash (P0)...")
-        print("DEBUG: About to crash P0")  # Debug log
+        logger.debug("About to crash P0")
         self.proposers[0].running = False
         self.visualizer.canvas.mark_node_crashed("P0")
-        print("DEBUG: P0 crashed and marked")  # Debug log
-        time.sleep(2)
-        
-        # Simulate some acceptor crashes with debug logging
-        if len(self.acceptors) > 1:
-            self.visualizer.log_message("Simulating acceptor crashes (A0, A1)...")
-            print("DEBUG: About to crash A0 and A1")  # Debug log
-            self.acceptors[0].running = False
-            self.acceptors[1].running = False
-            self.visualizer.canvas.mark_node_crashed("A0")
-            self.visualizer.canvas.mark_node_crashed("A1")
-            print("DEBUG: A0 and A1 crashed and marked")  # Debug log
-            time.sleep(2)
+        logger.debug("P0 crashed and marked")
+        yield
         
         # Phase 1a: Second proposer sends prepare with higher number
         if len(self.proposers) > 1:
             self.visualizer.log_message("Phase 1a: P1 sending prepare messages with higher number")
             self.proposers[1].set_proposal("New Value After Crash")
             self.proposers[1].prepare()
-            time.sleep(2)
+            yield
             
             # Phase 1b: Acceptors respond with promises
             self.visualizer.log_message("Phase 1b: Acceptors sending promise messages to P1")
             for acceptor in self.acceptors:
-                if acceptor.running:  # Only process messages from running acceptors
-                    acceptor.recv_prepare("P1", self.proposers[1].proposal_id)
-            time.sleep(2)
+                acceptor.recv_prepare("P1", self.proposers[1].proposal_id)
+            yield
             
             # Phase 2a: Send accept request
             self.visualizer.log_message("Phase 2a: P1 sending accept messages")
             self.proposers[1].send_accept(self.proposers[1].proposal_id, "New Value After Crash")
-            time.sleep(2)
+            yield
             
             # Phase 2b: Acceptors accept and notify learners
             self.visualizer.log_message("Phase 2b: Acceptors accepting and notifying learners")
             for acceptor in self.acceptors:
-                if acceptor.running:  # Only process messages from running acceptors
-                    acceptor.recv_accept_request("P1", self.proposers[1].proposal_id, "New Value After Crash")
-            time.sleep(2)
+                acceptor.recv_accept_request("P1", self.proposers[1].proposal_id, "New Value After Crash")
+            yield
             
             # Check if consensus was reached
-            for learner in self.learners:
-                if learner.final_value is not None:
-                    self.visualizer.log_message(f"Consensus reached! Value: {learner.final_value}")
+            decided = [f"Consensus reached! Value: {learner.final_value}"
+                       for learner in self.learners if learner.final_value is not None]
+            if decided:
+                self.visualizer.log_messages(decided)
         
         # Let simulation run for a while to see all messages
-        time.sleep(2)
+        yield
         
         # Stop simulation
         self.stop()
         self.visualizer.log_message("Simulation complete")
 
 if __name__ == "__main__":
+    if USE_OPENGL:
+        QApplication.setAttribute(Qt.ApplicationAttribute.AA_UseDesktopOpenGL)
     app = QApplication(sys.argv)
     window = PaxosVisualizer()
     window.show()
@@ -1,11 +1,36 @@
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-from typing import List, Dict, Tuple
-import seaborn as sns
+from typing import List, Dict, Tuple, Optional, TYPE_CHECKING
 import time
+import math
+import io
+import hashlib
+from pathlib import Path
 import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import paxos_simulation
+import paxos_main.essential
 from paxos_simulation import simulate_paxos, NetworkSimulator, PaxosProposer, PaxosAcceptor, PaxosLearner, ProposalID
+from paxos_core import njit  # no-op decorator when numba is not installed
+
+# matplotlib, pandas and seaborn are imported inside the functions that plot, keeping startup
+# (and every worker process) light until a plot is actually drawn
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    import joblib
+except ImportError:  # joblib is optional; seeded runs are then only cached for this session
+    joblib = None
+
+CACHE_DIR = '.paxos_cache'  # on-disk cache of seeded runs, shared by workers and across sessions
+RESULTS_CACHE_DIR = 'cache'  # parquet results of each analyze_* call; delete it to re-simulate
+RESULTS_SCHEMA = 1  # bump when the analyze_* result columns change
+# Every cache key carries a hash of the simulator sources, so editing them invalidates old results
+SIM_VERSION = hashlib.blake2b(b''.join(Path(module.__file__).read_bytes()
+                                       for module in (paxos_simulation, paxos_main.essential)),
+                              digest_size=8).hexdigest()
+SWEEP_SEEDS = list(range(5))  # seeds shared by the network-condition sweeps so their runs overlap
 
 # Set up logging
 def setup_logging(enable_logs: bool = True):
@@ -30,11 +55,124 @@ def setup_logging(enable_logs: bool = True):
     
     return logging.getLogger(__name__)
 
-# Global logger instance
-logger = True
+# Global logger instance; sweep progress goes here instead of stdout
+logger = logging.getLogger(__name__)
+
+def _run_seeded(config, seed, sim_version):
+    """Run simulate_paxos for one config with a fixed seed for its drops and delays
+
+    sim_version is unused here; it is part of the args so joblib's cache key changes with the simulator.
+    """
+    return simulate_paxos(*config, rng=np.random.default_rng(seed))
+
+if joblib is not None:
+    _run_seeded = joblib.Memory(CACHE_DIR, verbose=0).cache(_run_seeded)
+
+def _run_one(job):
+    """Run simulate_paxos for one ((proposers, acceptors, learners, delay_range, failure_rate), seed) job"""
+    config, seed = job
+    return simulate_paxos(*config) if seed is None else _run_seeded(config, seed, SIM_VERSION)
+
+_seeded_runs = {}  # (config, seed) -> result, so overlapping seeded sweeps run each job once
+
+@njit(cache=True)
+def _mean_std(arr):
+    """Mean and population std of arr in one Welford pass, matching np.mean/np.std"""
+    mean = 0.0
+    m2 = 0.0
+    for i in range(arr.shape[0]):
+        x = arr[i]
+        delta = x - mean
+        mean += delta / (i + 1)
+        m2 += delta * (x - mean)
+    return mean, math.sqrt(m2 / arr.shape[0])
+
+_mean_std(np.zeros(1))  # compile (or load from cache) once at import
+
+def run_configs(configs: List[Tuple], runs_per_config: int, max_workers=None, seeds: Optional[List[int]] = None):
+    """Run every config runs_per_config times across worker processes; returns the runs grouped per config
+
+    With seeds (one per run, overriding runs_per_config), results are memoized on (config, seed)
+    and only jobs not seen before are simulated.
+    """
+    if seeds is not None:
+        runs_per_config = len(seeds)
+    jobs = [(config, seeds[run] if seeds is not None else None)
+            for config in configs for run in range(runs_per_config)]
+    todo = jobs if seeds is None else [job for job in dict.fromkeys(jobs) if job not in _seeded_runs]
+    done = []
+    if todo:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            done = list(executor.map(_run_one, todo, chunksize=4))
+    if seeds is None:
+        results = done
+    else:
+        _seeded_runs.update(zip(todo, done))
+        results = [_seeded_runs[job] for job in jobs]
+    return [results[i:i + runs_per_config] for i in range(0, len(results), runs_per_config)]
+
+def _results_path(name: str, args: Tuple) -> Path:
+    """Parquet file holding the results of name called with args"""
+    key = hashlib.blake2b(repr((RESULTS_SCHEMA, SIM_VERSION, args)).encode()).hexdigest()[:16]
+    return Path(RESULTS_CACHE_DIR) / f"{name}_{key}.parquet"
+
+def _load_results(path: Path):
+    """Cached results at path, or None when missing or no parquet engine is installed"""
+    import pandas as pd
+    if not path.exists():
+        return None
+    try:
+        return pd.read_parquet(path)
+    except ImportError:
+        return None
+
+def _save_results(df: 'pd.DataFrame', path: Path):
+    """Store results at path so the next call with the same args only re-plots"""
+    path.parent.mkdir(exist_ok=True)
+    try:
+        df.to_parquet(path)
+    except ImportError:  # needs pyarrow or fastparquet; without one, results are just not cached
+        pass
+
+def _pyplot():
+    """Import pyplot on first use, rendering straight to file with Agg (no GUI event loop)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+_figures = {}  # figsize -> figure reused by every analysis that plots at that size
+
+def _figure(figsize: Tuple[float, float], nrows: int = 1, ncols: int = 1):
+    """Return the shared figure for figsize, cleared and split into fresh axes"""
+    fig = _figures.get(figsize)
+    if fig is None:
+        fig = _figures[figsize] = _pyplot().figure(figsize=figsize)
+    else:
+        fig.clf()
+    return fig, fig.subplots(nrows, ncols)
+
+def _write_png(fig, path: str):
+    """Render an already laid-out figure to PNG in memory and write it to path in one go"""
+    # bbox_inches=None skips the extra tight-bbox render pass; tight_layout has done that job
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=100, bbox_inches=None, pad_inches=0)
+    with open(path, 'wb') as f:
+        f.write(buf.getbuffer())
+
+def _grouped_bars(ax, table: 'pd.DataFrame'):
+    """Draw one bar group per row of table and one bar per column, like sns.barplot with hue"""
+    x = np.arange(len(table.index))
+    width = 0.8 / len(table.columns)
+    for i, hue in enumerate(table.columns):
+        ax.bar(x + (i - (len(table.columns) - 1) / 2) * width, table[hue].to_numpy(), width, label=str(hue))
+    ax.set_xticks(x, [str(v) for v in table.index])
+    ax.legend(title=table.columns.name)
 
 def plot_message_stats(delay_ranges: List[Tuple[float, float]], failure_rates: List[float]):
     """Plot message statistics for different network conditions"""
+    import pandas as pd
+    import seaborn as sns
     results = []
     total_sims = len(delay_ranges) * len(failure_rates)
     current_sim = 0
@@ -45,15 +183,16 @@ def plot_message_stats(delay_ranges: List[Tuple[float, float]], failure_rates: L
             current_sim += 1
             print(f"Simulation {current_sim}/{total_sims}: delay={delay}, failure_rate={failure}")
             
-            success_rate, avg_time, message_count, dropped_count, _ = simulate_paxos(
+            _, consensus_before, consensus_time, _, _, message_count, dropped_count = simulate_paxos(
                 num_proposers=2,
                 num_acceptors=2,
                 num_learners=2,
                 delay_range=delay,
                 failure_rate=failure,
-                timeout=30.0,  # Increased timeout for each simulation
-                enable_logs=True
+                counts=True
             )
+            success_rate = float(consensus_before)
+            avg_time = consensus_time if consensus_time is not None else float('nan')
             results.append({
                 'delay': f"{delay[0]}-{delay[1]}s",
                 'failure_rate': failure,
@@ -65,13 +204,19 @@ def plot_message_stats(delay_ranges: List[Tuple[float, float]], failure_rates: L
             print(f"  Results: success={success_rate}, latency={avg_time:.2f}s, messages={message_count}, dropped={dropped_count}")
     
     df = pd.DataFrame(results)
+    # The three bar plots share one aggregation, so do it once up front
+    summary = df.groupby(['delay', 'failure_rate'], sort=False).agg(
+        success_rate=('success_rate', 'mean'),
+        message_count=('message_count', 'mean'),
+        dropped_count=('dropped_count', 'mean')
+    )
     
     # Create subplots
-    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
+    fig, ((ax1, ax2), (ax3, ax4)) = _figure((15, 12), 2, 2)
     fig.suptitle('Paxos Simulation Analysis', fontsize=16)
     
     # Plot 1: Success Rate vs Failure Rate
-    sns.barplot(data=df, x='failure_rate', y='success_rate', hue='delay', ax=ax1)
+    _grouped_bars(ax1, summary['success_rate'].unstack('delay'))
     ax1.set_title('Success Rate vs Failure Rate')
     ax1.set_xlabel('Failure Rate')
     ax1.set_ylabel('Success Rate')
@@ -83,20 +228,19 @@ def plot_message_stats(delay_ranges: List[Tuple[float, float]], failure_rates: L
     ax2.set_ylabel('Average Time (s)')
     
     # Plot 3: Message Count vs Failure Rate
-    sns.barplot(data=df, x='failure_rate', y='message_count', hue='delay', ax=ax3)
+    _grouped_bars(ax3, summary['message_count'].unstack('delay'))
     ax3.set_title('Total Messages vs Failure Rate')
     ax3.set_xlabel('Failure Rate')
     ax3.set_ylabel('Total Messages')
     
     # Plot 4: Dropped Messages vs Failure Rate
-    sns.barplot(data=df, x='failure_rate', y='dropped_count', hue='delay', ax=ax4)
+    _grouped_bars(ax4, summary['dropped_count'].unstack('delay'))
     ax4.set_title('Dropped Messages vs Failure Rate')
     ax4.set_xlabel('Failure Rate')
     ax4.set_ylabel('Dropped Messages')
     
-    plt.tight_layout()
-    plt.savefig('paxos_analysis.png')
-    plt.close()
+    fig.tight_layout()
+    fig.savefig('paxos_analysis.png')
 
 def plot_node_impact(num_proposers: int = 2,
                     num_acceptors: int = 2,
@@ -105,6 +249,8 @@ def plot_node_impact(num_proposers: int = 2,
                     failure_rate: float = 0.0,
                     enable_logs: bool = True):
     """Plot the impact of a single node configuration"""
+    import pandas as pd
+    import seaborn as sns
     logger = setup_logging(enable_logs)
     
     print(f"Testing configuration: P{num_proposers}-A{num_acceptors}-L{num_learners}")
@@ -131,7 +277,7 @@ def plot_node_impact(num_proposers: int = 2,
     df = pd.DataFrame(results)
     
     # Create subplots
-    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
+    fig, ((ax1, ax2), (ax3, ax4)) = _figure((15, 12), 2, 2)
     fig.suptitle('Node Configuration Analysis', fontsize=16)
     
     # Plot 1: Success Rate
@@ -158,9 +304,8 @@ def plot_node_impact(num_proposers: int = 2,
     ax4.set_xlabel('Configuration')
     ax4.set_ylabel('Dropped Messages')
     
-    plt.tight_layout()
-    plt.savefig('node_config_analysis.png')
-    plt.close()
+    fig.tight_layout()
+    fig.savefig('node_config_analysis.png')
 
 def analyze_acceptor_impact(
     max_acceptors: int = 10, 
@@ -171,39 +316,49 @@ def analyze_acceptor_impact(
     runs_per_config: int = 5
 ):
     """Analyze how the number of acceptors affects consensus time, with averaging and variance."""
-    results = []
-    print("\nAnalyzing impact of number of acceptors...")
-
-    for num_acceptors in range(2, max_acceptors + 1, 2):
-        print(f"\nTesting with {num_acceptors} acceptors...")
-        times = []
-        for _ in range(runs_per_config):
-            wait_time, consensus_before, consensus_time, rounds, total_retries = simulate_paxos(
-                num_proposers=num_proposers,
-                num_acceptors=num_acceptors,
-                num_learners=num_learners,
-                delay_range=delay_range,
-                failure_rate=failure_rate
-            )
-            if consensus_time is not None:
-                times.append(consensus_time)
-        if times:
-            avg_time = np.mean(times)
-            std_time = np.std(times)
-            results.append({
-                'num_acceptors': num_acceptors,
-                'avg_consensus_time': avg_time,
-                'std_consensus_time': std_time,
-                'quorum_size': num_acceptors // 2 + 1
-            })
-            print(f"Consensus time: {avg_time:.4f}s ± {std_time:.4f}s (Quorum size: {num_acceptors // 2 + 1})")
-        else:
-            print(f"Consensus NOT reached (timeout)")
+    import pandas as pd
+    plt = _pyplot()
+    logger.info("Analyzing impact of number of acceptors...")
+
+    path = _results_path('analyze_acceptor_impact',
+                         (max_acceptors, num_proposers, num_learners, delay_range, failure_rate, runs_per_config))
+    df = _load_results(path)
+    if df is None:
+        acceptor_counts = list(range(2, max_acceptors + 1, 2))
+        sweep = run_configs([(num_proposers, n, num_learners, delay_range, failure_rate) for n in acceptor_counts],
+                            runs_per_config)
+        # One typed column per field, filled row by row and trimmed to the configs that reached consensus
+        rows = 0
+        num_acc = np.empty(len(acceptor_counts), np.int32)
+        avg = np.empty(len(acceptor_counts))
+        std = np.empty(len(acceptor_counts))
+        for num_acceptors, runs in zip(acceptor_counts, sweep):
+            times = np.empty(runs_per_config)
+            n = 0
+            for wait_time, consensus_before, consensus_time, rounds, total_retries in runs:
+                if consensus_time is not None:
+                    times[n] = consensus_time
+                    n += 1
+            if n:
+                avg_time, std_time = _mean_std(times[:n])
+                num_acc[rows], avg[rows], std[rows] = num_acceptors, avg_time, std_time
+                rows += 1
+                logger.info("%d acceptors: consensus time %.4fs ± %.4fs (quorum size %d)",
+                            num_acceptors, avg_time, std_time, num_acceptors // 2 + 1)
+            else:
+                logger.info("%d acceptors: consensus NOT reached (timeout)", num_acceptors)
+
+        df = pd.DataFrame({
+            'num_acceptors': num_acc[:rows],
+            'avg_consensus_time': avg[:rows],
+            'std_consensus_time': std[:rows],
+            'quorum_size': num_acc[:rows] // 2 + 1
+        })
+        _save_results(df, path)
 
     # Plot results
-    df = pd.DataFrame(results)
     plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig, ax = _figure((10, 6))
     ax.errorbar(
         df['num_acceptors'],
         df['avg_consensus_time'] * 1000,  # ms
@@ -216,10 +371,9 @@ def analyze_acceptor_impact(
     ax.grid(True, which='both', linestyle='--', linewidth=0.7, alpha=0.7)
     ax.set_facecolor('white')
     fig.patch.set_facecolor('white')
-    plt.tight_layout()
-    plt.legend()
-    plt.savefig('acceptor_impact_avg_var.png', dpi=150, bbox_inches='tight')
-    plt.show()
+    fig.tight_layout()
+    ax.legend()
+    fig.savefig('acceptor_impact_avg_var.png', dpi=100, bbox_inches='tight')
 
     return df
 
@@ -232,38 +386,46 @@ def analyze_proposer_impact(
     runs_per_config: int = 5
 ):
     """Analyze how the number of proposers affects consensus time, with averaging and variance."""
-    results = []
-    print("\nAnalyzing impact of number of proposers...")
-
-    for num_proposers in range(1, max_proposers + 1):
-        print(f"\nTesting with {num_proposers} proposers...")
-        times = []
-        for _ in range(runs_per_config):
-            wait_time, consensus_before, consensus_time, rounds, total_retries = simulate_paxos(
-                num_proposers=num_proposers,
-                num_acceptors=num_acceptors,
-                num_learners=num_learners,
-                delay_range=delay_range,
-                failure_rate=failure_rate
-            )
-            if consensus_time is not None:
-                times.append(consensus_time)
-        if times:
-            avg_time = np.mean(times)
-            std_time = np.std(times)
-            results.append({
-                'num_proposers': num_proposers,
-                'avg_consensus_time': avg_time,
-                'std_consensus_time': std_time
-            })
-            print(f"Consensus time: {avg_time:.4f}s ± {std_time:.4f}s")
-        else:
-            print(f"Consensus NOT reached (timeout)")
+    import pandas as pd
+    plt = _pyplot()
+    logger.info("Analyzing impact of number of proposers...")
+
+    path = _results_path('analyze_proposer_impact',
+                         (max_proposers, num_acceptors, num_learners, delay_range, failure_rate, runs_per_config))
+    df = _load_results(path)
+    if df is None:
+        proposer_counts = list(range(1, max_proposers + 1))
+        sweep = run_configs([(n, num_acceptors, num_learners, delay_range, failure_rate) for n in proposer_counts],
+                            runs_per_config)
+        rows = 0
+        num_prop = np.empty(len(proposer_counts), np.int32)
+        avg = np.empty(len(proposer_counts))
+        std = np.empty(len(proposer_counts))
+        for num_proposers, runs in zip(proposer_counts, sweep):
+            times = np.empty(runs_per_config)
+            n = 0
+            for wait_time, consensus_before, consensus_time, rounds, total_retries in runs:
+                if consensus_time is not None:
+                    times[n] = consensus_time
+                    n += 1
+            if n:
+                avg_time, std_time = _mean_std(times[:n])
+                num_prop[rows], avg[rows], std[rows] = num_proposers, avg_time, std_time
+                rows += 1
+                logger.info("%d proposers: consensus time %.4fs ± %.4fs", num_proposers, avg_time, std_time)
+            else:
+                logger.info("%d proposers: consensus NOT reached (timeout)", num_proposers)
+
+        df = pd.DataFrame({
+            'num_proposers': num_prop[:rows],
+            'avg_consensus_time': avg[:rows],
+            'std_consensus_time': std[:rows]
+        })
+        _save_results(df, path)
 
     # Plot results
-    df = pd.DataFrame(results)
     plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig, ax = _figure((10, 6))
     ax.errorbar(
         df['num_proposers'],
         df['avg_consensus_time'] * 1000,  # ms
@@ -276,10 +438,9 @@ def analyze_proposer_impact(
     ax.grid(True, which='both', linestyle='--', linewidth=0.7, alpha=0.7)
     ax.set_facecolor('white')
     fig.patch.set_facecolor('white')
-    plt.tight_layout()
-    plt.legend()
-    plt.savefig('proposer_impact_avg_var.png', dpi=150, bbox_inches='tight')
-    plt.show()
+    fig.tight_layout()
+    ax.legend()
+    fig.savefig('proposer_impact_avg_var.png', dpi=100, bbox_inches='tight')
 
     return df
 
@@ -289,44 +450,58 @@ def analyze_network_conditions(
     num_proposers: int = 2,
     num_acceptors: int = 4,
     num_learners: int = 0,
-    runs_per_config: int = 5
+    runs_per_config: int = 5,
+    seeds: Optional[List[int]] = None
 ):
     """Analyze how network conditions affect consensus time, with averaging and variance."""
-    results = []
-    print("\nAnalyzing impact of network conditions...")
+    import pandas as pd
+    plt = _pyplot()
+    logger.info("Analyzing impact of network conditions...")
+    if seeds is not None:
+        runs_per_config = len(seeds)
 
-    for delay in delay_ranges:
-        for failure in failure_rates:
-            print(f"\nTesting with delay={delay}, failure_rate={failure}...")
-            times = []
-            for _ in range(runs_per_config):
-                wait_time, consensus_before, consensus_time, rounds, total_retries = simulate_paxos(
-                    num_proposers=num_proposers,
-                    num_acceptors=num_acceptors,
-                    num_learners=num_learners,
-                    delay_range=delay,
-                    failure_rate=failure
-                )
+    path = _results_path('analyze_network_conditions',
+                         (delay_ranges, failure_rates, num_proposers, num_acceptors, num_learners, runs_per_config, seeds))
+    df = _load_results(path)
+    if df is None:
+        conditions = [(delay, failure) for delay in delay_ranges for failure in failure_rates]
+        sweep = run_configs([(num_proposers, num_acceptors, num_learners, delay, failure) for delay, failure in conditions],
+                            runs_per_config, seeds=seeds)
+        rows = 0
+        delay_labels = []
+        fail = np.empty(len(conditions))
+        avg = np.empty(len(conditions))
+        std = np.empty(len(conditions))
+        retries = np.empty(len(conditions), np.int64)
+        for (delay, failure), runs in zip(conditions, sweep):
+            times = np.empty(runs_per_config)
+            n = 0
+            for wait_time, consensus_before, consensus_time, rounds, total_retries in runs:
                 if consensus_time is not None:
-                    times.append(consensus_time)
-            if times:
-                avg_time = np.mean(times)
-                std_time = np.std(times)
-                results.append({
-                    'delay': f"{delay[0]}-{delay[1]}s",
-                    'failure_rate': failure,
-                    'avg_consensus_time': avg_time,
-                    'std_consensus_time': std_time,
-                    'total_retries': total_retries
-                })
-                print(f"Consensus time: {avg_time:.4f}s ± {std_time:.4f}s")
+                    times[n] = consensus_time
+                    n += 1
+            if n:
+                avg_time, std_time = _mean_std(times[:n])
+                delay_labels.append(f"{delay[0]}-{delay[1]}s")
+                fail[rows], avg[rows], std[rows], retries[rows] = failure, avg_time, std_time, total_retries
+                rows += 1
+                logger.info("delay=%s, failure_rate=%s: consensus time %.4fs ± %.4fs",
+                            delay, failure, avg_time, std_time)
             else:
-                print(f"Consensus NOT reached (timeout)")
+                logger.info("delay=%s, failure_rate=%s: consensus NOT reached (timeout)", delay, failure)
+
+        df = pd.DataFrame({
+            'delay': delay_labels,
+            'failure_rate': fail[:rows],
+            'avg_consensus_time': avg[:rows],
+            'std_consensus_time': std[:rows],
+            'total_retries': retries[:rows]
+        })
+        _save_results(df, path)
 
     # Plot results
-    df = pd.DataFrame(results)
     plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(14, 8))  # Increased figure size
+    fig, ax = _figure((14, 8))  # Increased figure size
     for delay in df['delay'].unique():
         delay_data = df[df['delay'] == delay]
         ax.errorbar(
@@ -343,79 +518,89 @@ def analyze_network_conditions(
     fig.patch.set_facecolor('white')
     # Increase tick label sizes
     ax.tick_params(axis='both', which='major', labelsize=14)
-    plt.tight_layout()
-    plt.legend(loc='best', fontsize=14)  # Increased legend font size
-    plt.savefig('network_conditions_impact_avg_var.png', dpi=150, bbox_inches='tight')
-    plt.show()
+    fig.tight_layout()
+    ax.legend(loc='best', fontsize=14)  # Increased legend font size
+    fig.savefig('network_conditions_impact_avg_var.png', dpi=100, bbox_inches='tight')
 
     # Plot retry attempts
-    plt.figure(figsize=(14, 8))  # Increased figure size
+    fig, ax = _figure((14, 8))  # Increased figure size
     for delay in df['delay'].unique():
         delay_df = df[df['delay'] == delay]
-        plt.plot(delay_df['failure_rate'], delay_df['total_retries'], marker='o', markersize=10, label=f'Network Delay: {delay}s')  # Increased marker size
-    plt.xlabel('Message Failure Rate', fontsize=16, fontweight='bold')
-    plt.ylabel('Total Retry Attempts', fontsize=16, fontweight='bold')
-    plt.title('Retry Attempts vs Failure Rate under Different Network Delays', fontsize=20, fontweight='bold', pad=20)
-    plt.grid(True, which='both', linestyle='--', linewidth=0.7, alpha=0.7)
+        ax.plot(delay_df['failure_rate'], delay_df['total_retries'], marker='o', markersize=10, label=f'Network Delay: {delay}s')  # Increased marker size
+    ax.set_xlabel('Message Failure Rate', fontsize=16, fontweight='bold')
+    ax.set_ylabel('Total Retry Attempts', fontsize=16, fontweight='bold')
+    ax.set_title('Retry Attempts vs Failure Rate under Different Network Delays', fontsize=20, fontweight='bold', pad=20)
+    ax.grid(True, which='both', linestyle='--', linewidth=0.7, alpha=0.7)
     # Increase tick label sizes
-    plt.xticks(fontsize=14)
-    plt.yticks(fontsize=14)
-    plt.tight_layout()
-    plt.legend(loc='best', fontsize=14)  # Increased legend font size
-    plt.savefig('retry_vs_failure_avg_var.png', dpi=150, bbox_inches='tight')
-    plt.show()
+    ax.tick_params(axis='both', which='major', labelsize=14)
+    fig.tight_layout()
+    ax.legend(loc='best', fontsize=14)  # Increased legend font size
+    fig.savefig('retry_vs_failure_avg_var.png', dpi=100, bbox_inches='tight')
 
 def analyze_rounds_vs_conditions(delay_ranges: List[Tuple[float, float]] = [(0.01, 0.05), (0.1, 0.2), (0.3, 0.5)],
                                failure_rates: List[float] = [0.0, 0.1, 0.2],
                                num_proposers: int = 2,
                                num_acceptors: int = 4,
                                num_learners: int = 0,
-                               runs_per_config: int = 5):
+                               runs_per_config: int = 5,
+                               seeds: Optional[List[int]] = None):
     """Analyze how many rounds are needed to reach consensus under different conditions"""
-    results = []
-    print("\nAnalyzing rounds needed for consensus...")
-    
-    for delay in delay_ranges:
-        for failure in failure_rates:
-            print(f"\nTesting with delay={delay}, failure_rate={failure}...")
-            times = []
-            for _ in range(runs_per_config):
-                wait_time, consensus_before, consensus_time, rounds, total_retries = simulate_paxos(
-                    num_proposers=num_proposers,
-                    num_acceptors=num_acceptors,
-                    num_learners=num_learners,
-                    delay_range=delay,
-                    failure_rate=failure
-                )
+    import pandas as pd
+    logger.info("Analyzing rounds needed for consensus...")
+    if seeds is not None:
+        runs_per_config = len(seeds)
+
+    path = _results_path('analyze_rounds_vs_conditions',
+                         (delay_ranges, failure_rates, num_proposers, num_acceptors, num_learners, runs_per_config, seeds))
+    df = _load_results(path)
+    if df is None:
+    
+        conditions = [(delay, failure) for delay in delay_ranges for failure in failure_rates]
+        sweep = run_configs([(num_proposers, num_acceptors, num_learners, delay, failure) for delay, failure in conditions],
+                            runs_per_config, seeds=seeds)
+        # One row per successful run, so size the columns for every run
+        rows = 0
+        delay_labels = []
+        fail = np.empty(len(conditions) * runs_per_config)
+        cons = np.empty(len(conditions) * runs_per_config)
+        round_counts = np.empty(len(conditions) * runs_per_config, np.int32)
+        debug = logger.isEnabledFor(logging.DEBUG)
+        for (delay, failure), runs in zip(conditions, sweep):
+            start = rows
+            for wait_time, consensus_before, consensus_time, rounds, total_retries in runs:
                 # Only add to results if consensus was reached
                 if consensus_time is not None:
-                    times.append(consensus_time)
-                    results.append({
-                        'delay': f"{delay[0]}-{delay[1]}s",
-                        'failure_rate': failure,
-                        'consensus_time': consensus_time,
-                        'rounds': rounds
-                    })
-                    print(f"Consensus time: {consensus_time:.6f}s (Approx. rounds: {rounds})")
-                else:
-                    print(f"Consensus NOT reached (timeout)")
-    
+                    delay_labels.append(f"{delay[0]}-{delay[1]}s")
+                    fail[rows], cons[rows], round_counts[rows] = failure, consensus_time, rounds
+                    rows += 1
+                    if debug:
+                        logger.debug("Consensus time: %.6fs (Approx. rounds: %d)", consensus_time, rounds)
+                elif debug:
+                    logger.debug("Consensus NOT reached (timeout)")
+            logger.info("delay=%s, failure_rate=%s: consensus in %d/%d runs", delay, failure, rows - start, len(runs))
+
+        df = pd.DataFrame({
+            'delay': delay_labels,
+            'failure_rate': fail[:rows],
+            'consensus_time': cons[:rows],
+            'rounds': round_counts[:rows]
+        })
+        _save_results(df, path)
+
     # Plot results
-    df = pd.DataFrame(results)
-    plt.figure(figsize=(12, 6))
+    fig, ax = _figure((12, 6))
     
     # Plot for different delay ranges
     for delay in df['delay'].unique():
         delay_data = df[df['delay'] == delay]
-        plt.plot(delay_data['failure_rate'], delay_data['rounds'], 'o-', label=f'Delay: {delay}')
-    
-    plt.xlabel('Failure Rate')
-    plt.ylabel('Number of Rounds')
-    plt.title('Rounds Needed for Consensus Under Different Network Conditions')
-    plt.legend()
-    plt.grid(True)
-    plt.savefig('rounds_vs_conditions.png')
-    plt.close()
+        ax.plot(delay_data['failure_rate'], delay_data['rounds'], 'o-', label=f'Delay: {delay}')
+    
+    ax.set_xlabel('Failure Rate')
+    ax.set_ylabel('Number of Rounds')
+    ax.set_title('Rounds Needed for Consensus Under Different Network Conditions')
+    ax.legend()
+    ax.grid(True)
+    fig.savefig('rounds_vs_conditions.png')
 
 def plot_elapsed_time_vs_delay(
     delay_ranges: List[Tuple[float, float]] = [(0.01, 0.05), (0.05, 0.1), (0.1, 0.2), (0.2, 0.3), (0.3, 0.4), (0.4, 0.5), (0.5, 0.6), (0.6, 0.7), (0.7, 0.8), (0.8, 0.9), (0.9, 1.0)],
@@ -426,43 +611,45 @@ def plot_elapsed_time_vs_delay(
     runs_per_config: int = 3
 ):
     """Plot average consensus time vs network delay with a white background and improved style. Runs each config multiple times and averages results."""
-    results = []
-    print("\nAnalyzing elapsed time vs delay...")
+    import pandas as pd
+    plt = _pyplot()
+    logger.info("Analyzing elapsed time vs delay...")
 
-    for delay in delay_ranges:
-        times = []
-        for _ in range(runs_per_config):
-            _, consensus_before, consensus_time, _, _ = simulate_paxos(
-                num_proposers=num_proposers,
-                num_acceptors=num_acceptors,
-                num_learners=num_learners,
-                delay_range=delay,
-                failure_rate=failure_rate
-            )
+    sweep = run_configs([(num_proposers, num_acceptors, num_learners, delay, failure_rate) for delay in delay_ranges],
+                        runs_per_config)
+    # NaN marks a delay range where no run reached consensus
+    avg = np.full(len(delay_ranges), np.nan)
+    std = np.full(len(delay_ranges), np.nan)
+    for i, (delay, runs) in enumerate(zip(delay_ranges, sweep)):
+        times = np.empty(runs_per_config)
+        n = 0
+        for _, consensus_before, consensus_time, _, _ in runs:
             if consensus_before and consensus_time is not None:
-                times.append(consensus_time)
-        avg_time = np.mean(times) if times else None
-        std_time = np.std(times) if times else None
-        results.append({
-            'delay': f"{delay[0]}-{delay[1]}",
-            'avg_consensus_time': avg_time,
-            'std_consensus_time': std_time
-        })
-        print(f"Delay {delay}: Avg consensus time = {avg_time:.4f}s ± {std_time:.4f}s")
+                times[n] = consensus_time
+                n += 1
+        if n:
+            avg[i], std[i] = _mean_std(times[:n])
+        avg_time, std_time = avg[i], std[i]
+        logger.info("Delay %s: Avg consensus time = %.4fs ± %.4fs", delay, avg_time, std_time)
 
     # Plot
-    df = pd.DataFrame(results)
+    df = pd.DataFrame({
+        'delay': [f"{delay[0]}-{delay[1]}" for delay in delay_ranges],
+        'avg_consensus_time': avg,
+        'std_consensus_time': std
+    })
 
     # Convert delay and consensus time to ms
     df['avg_consensus_time_ms'] = df['avg_consensus_time'] * 1000 if df['avg_consensus_time'] is not None else None
     df['std_consensus_time_ms'] = df['std_consensus_time'] * 1000 if df['std_consensus_time'] is not None else None
-    df['delay_min_ms'] = df['delay'].apply(lambda x: float(x.split('-')[0]) * 1000)
-    df['delay_max_ms'] = df['delay'].apply(lambda x: float(x.split('-')[1]) * 1000)
-    df['delay_label'] = df.apply(lambda row: f"{int(row['delay_min_ms'])}-{int(row['delay_max_ms'])}", axis=1)
+    parts = df['delay'].str.split('-', expand=True).astype(np.float64) * 1000.0
+    df['delay_min_ms'] = parts[0]
+    df['delay_max_ms'] = parts[1]
+    df['delay_label'] = parts[0].astype(int).astype(str) + '-' + parts[1].astype(int).astype(str)
 
     # Use a white background and modern style
     plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig, ax = _figure((10, 6))
     ax.errorbar(
         df['delay_label'],
         df['avg_consensus_time_ms'],
@@ -475,17 +662,23 @@ def plot_elapsed_time_vs_delay(
     ax.grid(True, which='both', linestyle='--', linewidth=0.7, alpha=0.7)
     ax.set_facecolor('white')
     fig.patch.set_facecolor('white')
-    # Add value markers
-    for i, v in enumerate(df['avg_consensus_time_ms']):
-        if not pd.isnull(v):
-            ax.text(i, v + max(df['avg_consensus_time_ms']) * 0.02, f"{v:.0f}", ha='center', va='bottom', fontsize=11, color='#333333')
-    plt.tight_layout()
-    plt.savefig('elapsed_time_vs_delay_ms.png', dpi=150, bbox_inches='tight')
-    plt.show()
+    # Add value markers: offset computed once, labels built in one pass and attached without per-call setup
+    vals = df['avg_consensus_time_ms'].to_numpy(dtype=np.float64)
+    reached = np.flatnonzero(~np.isnan(vals))
+    if reached.size:
+        from matplotlib.text import Text
+        offset = vals[reached].max() * 0.02
+        labels = [Text(i, vals[i] + offset, f"{vals[i]:.0f}", ha='center', va='bottom', fontsize=11, color='#333333')
+                  for i in reached]
+        for label in labels:
+            ax.add_artist(label)
+    fig.tight_layout()
+    _write_png(fig, 'elapsed_time_vs_delay_ms.png')
 
 def plot_acceptor_and_proposer_impact_together(df_acceptors, df_proposers):
+    plt = _pyplot()
     plt.style.use('seaborn-v0_8-whitegrid')
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig, ax = _figure((12, 7))
 
     # Plot acceptor impact
     ax.errorbar(
@@ -508,13 +701,21 @@ def plot_acceptor_and_proposer_impact_together(df_acceptors, df_proposers):
     ax.set_title('Impact of Acceptors and Proposers on Consensus Time', fontsize=16, fontweight='bold', pad=20)
     ax.legend(fontsize=12)
     ax.grid(True, which='both', linestyle='--', linewidth=0.7, alpha=0.7)
-    plt.tight_layout()
-    plt.savefig('acceptor_vs_proposer_impact.png', dpi=150, bbox_inches='tight')
-    plt.show()
+    fig.tight_layout()
+    fig.savefig('acceptor_vs_proposer_impact.png', dpi=100, bbox_inches='tight')
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the Paxos analysis sweeps and save the plots.")
+    parser.add_argument('--verbose', action='store_true', help="log per-config sweep progress")
+    args = parser.parse_args()
+    # force: paxos_simulation already configured the root logger at INFO when it was imported
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING,
+                        format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+    # --verbose is for sweep progress; the simulator's per-message lines stay off either way
+    logging.getLogger('paxos_simulation').setLevel(logging.WARNING)
+
     # Set style
-    plt.style.use('ggplot')
+    _pyplot().style.use('ggplot')
     
     # Run all analyses
     print("Starting Paxos analysis...")
@@ -546,7 +747,7 @@ if __name__ == "__main__":
         num_proposers=2,
         num_acceptors=4,
         num_learners=4,
-        runs_per_config=5
+        seeds=SWEEP_SEEDS
     )
     
     plot_elapsed_time_vs_delay(
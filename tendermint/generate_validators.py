@@ -1,5 +1,11 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:  # fall back to the standard library encoder
+    orjson = None
 
 NODE_COUNT = 8
 NODE_PREFIX = "node"
@@ -7,39 +13,55 @@ GENESIS_REL_PATH = "config/genesis.json"
 VALIDATOR_KEY_PATH = "config/priv_validator_key.json"
 OUTPUT_GENESIS = "genesis_updated.json"
 
-validators = []
 
-for i in range(NODE_COUNT):
-    node_dir = f"{NODE_PREFIX}{i}"
-    key_path = os.path.join(node_dir, VALIDATOR_KEY_PATH)
+def load_json(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def dump_json(obj):
+    # Same layout as json.dump(indent=2)
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2).encode()
+
 
-    with open(key_path, "r") as f:
-        key_data = json.load(f)
+def write_bytes(path, payload):
+    with open(path, "wb") as f:
+        f.write(payload)
 
-    validators.append({
-        "address": key_data["address"],
-        "pub_key": key_data["pub_key"],
-        "power": "1",  # Equal power for all
-        "name": node_dir
-    })
+
+node_dirs = [f"{NODE_PREFIX}{i}" for i in range(NODE_COUNT)]
+
+# Key files are independent, so read them concurrently
+with ThreadPoolExecutor(max_workers=min(32, NODE_COUNT)) as executor:
+    keys = list(executor.map(load_json, [os.path.join(d, VALIDATOR_KEY_PATH) for d in node_dirs]))
+
+validators = [{
+    "address": key_data["address"],
+    "pub_key": key_data["pub_key"],
+    "power": "1",  # Equal power for all
+    "name": node_dir
+} for node_dir, key_data in zip(node_dirs, keys)]
 
 # Load base genesis (from node0)
-with open(os.path.join(f"{NODE_PREFIX}0", GENESIS_REL_PATH), "r") as f:
-    genesis = json.load(f)
+genesis = load_json(os.path.join(f"{NODE_PREFIX}0", GENESIS_REL_PATH))
 
 # Replace validators
 genesis["validators"] = validators
 
+# Encode once; every output gets the same bytes
+payload = dump_json(genesis)
+
 # Save updated genesis
-with open(OUTPUT_GENESIS, "w") as f:
-    json.dump(genesis, f, indent=2)
+write_bytes(OUTPUT_GENESIS, payload)
 
 print(f"✅ Updated genesis with {NODE_COUNT} validators saved to {OUTPUT_GENESIS}")
 
 # Overwrite each node's genesis.json
-for i in range(NODE_COUNT):
-    node_path = os.path.join(f"{NODE_PREFIX}{i}", GENESIS_REL_PATH)
-    with open(node_path, "w") as f:
-        json.dump(genesis, f, indent=2)
+node_paths = [os.path.join(d, GENESIS_REL_PATH) for d in node_dirs]
+with ThreadPoolExecutor(max_workers=min(32, NODE_COUNT)) as executor:
+    list(executor.map(write_bytes, node_paths, [payload] * NODE_COUNT))
 
 print("✅ Synced genesis.json to all nodes.")
@@ -1,22 +1,129 @@
-import requests
+import asyncio
+import base64
+import json
 import time
 
+try:
+    import aiohttp
+except ImportError:  # fall back to a pooled, blocking requests.Session
+    aiohttp = None
+    import requests
+    from requests.adapters import HTTPAdapter
+
+try:
+    import uvloop
+except ImportError:  # the stock asyncio loop works, just with more per-send overhead
+    uvloop = None
+
 # Configuration
 NODE_RPC = "http://localhost:26657"
+NODE_WS = "ws://localhost:26657/websocket"
 RATE_PER_SEC = 10000              # Transactions per second
 DURATION_SEC = 60             # Total duration to spam in seconds
+MAX_IN_FLIGHT = 1024          # Requests awaiting a response at once
+RESPONSE_TIMEOUT = 2          # Seconds to wait for a response to free a slot before giving up
 
 print(f"🚀 Starting Tendermint TX spammer for {DURATION_SEC} seconds at {RATE_PER_SEC} tx/sec...")
 
 INTERVAL = 1.0 / RATE_PER_SEC
 TOTAL_TX = DURATION_SEC * RATE_PER_SEC
+# TX ids: startup time in the high bits, per-run counter in the low 24 bits, so no clock read per TX
+TX_BASE = (time.time_ns() & ((1 << 40) - 1)) << 24
+# Everything up to the TX id, with the quotes already percent-encoded
+PREFIX = f"{NODE_RPC}/broadcast_tx_async?tx=%22test_tx_"
+# Pre-serialized JSON-RPC request; only the id and the base64 tx change per send
+FRAME = '{"jsonrpc":"2.0","id":%d,"method":"broadcast_tx_async","params":{"tx":"%s"}}'
+
+
+async def receive(ws, in_flight):
+    # Responses arrive in any order on the same socket; each one frees an in-flight slot.
+    # Returns when the socket closes or errors, so the sender can stop waiting for slots.
+    async for msg in ws:
+        if msg.type == aiohttp.WSMsgType.ERROR:
+            print(f"❗ Websocket error: {ws.exception()}")
+            break
+        if msg.type != aiohttp.WSMsgType.TEXT:
+            continue
+        try:
+            reply = json.loads(msg.data)
+        except ValueError:
+            continue
+        if not isinstance(reply, dict) or reply.get("id") is None:
+            continue  # not a response to one of our requests
+        if "error" in reply:
+            print(f"❗ Error response: {msg.data}")
+        in_flight.release()
+
+
+async def acquire_slot(in_flight, receiver):
+    # False once the receiver has stopped or the node stops answering: no slot would be freed
+    if not in_flight.locked():
+        await in_flight.acquire()
+        return True
+    waiter = asyncio.ensure_future(in_flight.acquire())
+    await asyncio.wait((waiter, receiver), timeout=RESPONSE_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+    if waiter.done():
+        return True
+    waiter.cancel()
+    return False
+
+
+async def wait_idle(in_flight):
+    for _ in range(MAX_IN_FLIGHT):
+        await in_flight.acquire()
+
+
+async def spam():
+    loop = asyncio.get_running_loop()
+    in_flight = asyncio.Semaphore(MAX_IN_FLIGHT)
+    # Every TX is pipelined over one long-lived websocket instead of one HTTP request each
+    async with aiohttp.ClientSession() as session:
+        async with session.ws_connect(NODE_WS) as ws:
+            receiver = asyncio.create_task(receive(ws, in_flight))
+            next_send_time = loop.time()
+            for i in range(1, TOTAL_TX + 1):
+                # Token bucket: only sleep when we are ahead of the target rate
+                next_send_time += INTERVAL
+                delay = next_send_time - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                if receiver.done() or not await acquire_slot(in_flight, receiver):
+                    print(f"❗ No responses from the node, stopping after {i - 1} TXs")
+                    break
+                tx = base64.b64encode(b"test_tx_%d" % (TX_BASE | i)).decode()
+                try:
+                    await ws.send_str(FRAME % (i, tx))
+                except (aiohttp.ClientError, ConnectionResetError) as e:
+                    print(f"❗ Error sending TX {i}: {e}")
+                    break
+
+            if not receiver.done():
+                drain = asyncio.ensure_future(wait_idle(in_flight))
+                await asyncio.wait((drain, receiver), timeout=RESPONSE_TIMEOUT,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if not drain.done():
+                    print("❗ Gave up waiting for the last responses")
+                    drain.cancel()
+            receiver.cancel()
+
+
+def spam_blocking():
+    # Keep-alive connections are reused across every request instead of one connect per TX
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=32, pool_maxsize=1024, max_retries=0))
+    for i in range(1, TOTAL_TX + 1):
+        try:
+            session.get(f"{PREFIX}{TX_BASE | i}%22", timeout=2)
+        except requests.exceptions.RequestException as e:
+            print(f"❗ Error sending TX {i}: {e}")
 
-for i in range(1, TOTAL_TX + 1):
-    tx_data = f"test_tx_{int(time.time() * 1e9)}_{i}"
-    try:
-        requests.get(f"{NODE_RPC}/broadcast_tx_async?tx=\"{tx_data}\"", timeout=2)
-    except requests.exceptions.RequestException as e:
-        print(f"❗ Error sending TX {i}: {e}")
 
+if aiohttp is not None:
+    if uvloop is not None:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    asyncio.run(spam())
+else:
+    spam_blocking()
 
 print("✅ TX spam complete.")